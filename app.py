@@ -1,12 +1,31 @@
 """Main Flask application."""
-from flask import Flask, render_template
+from flask import Flask, render_template, request, jsonify
 from datetime import timedelta
+import atexit
 import os
+import time
 
 # Import utilities
-from utils.config_parser import get_config, get_config_bool, get_config_int
-from utils.logger import setup_logger
-from utils.database import init_db
+from utils.config_parser import (get_config, get_config_bool, get_config_int, get_settings,
+                                 on_config_reload, start_config_watcher)
+from utils.logger import setup_logger, shutdown_logger, get_logging_stats
+from utils.database import init_db, shutdown_db, get_pool_stats, get_writer_stats
+from utils.async_database import shutdown_db_executor
+from utils.hashing import HashingBusyError, shutdown_hashing, get_hashing_stats
+from utils.session_store import init_session_store
+from utils.rate_limit import init_rate_limit, get_rate_limit_stats
+from utils.request_context import init_request_context
+from utils.metrics import init_metrics, register_collector
+from utils.templating import init_templating, get_fragment_cache_stats
+from utils.response_cache import init_response_cache, get_response_cache_stats, clear_response_cache
+from utils.assets import init_assets
+from utils.startup import startup_step, reset_startup_steps, log_startup_profile
+
+# Import models
+from models.user import get_user_cache_stats, get_search_cache_stats
+from models.user_repository import init_user_repository, get_user_store_stats
+from models.user_import import init_user_import
+from models.login_events import init_login_audit, shutdown_login_audit, get_login_audit_stats
 
 # Import blueprints
 from routes.auth_routes import auth_bp
@@ -15,6 +34,8 @@ from routes.api_routes import api_bp
 
 def create_app():
     """Create and configure the Flask application."""
+    started = time.perf_counter()
+    reset_startup_steps()
     app = Flask(__name__)
     
     # Load configuration from config.ini
@@ -22,40 +43,116 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
     
     # Initialize logger
-    logger = setup_logger()
+    with startup_step('logger'):
+        logger = setup_logger()
     logger.info("Starting Flask application")
     
+    # Registered first so it runs last and flushes shutdown messages
+    atexit.register(shutdown_logger)
+    
     # Initialize database
     try:
-        init_db()
+        with startup_step('database'):
+            init_db()
         logger.info("Database initialized successfully")
     except Exception as e:
-        logger.error(f"Database initialization failed: {str(e)}")
+        logger.error("Database initialization failed: %s", e)
         raise
     
-    # Register blueprints
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(main_bp)
-    app.register_blueprint(api_bp)
+    # User storage (single database, in-memory or sharded)
+    with startup_step('user_store'):
+        init_user_repository(app)
+        init_user_import(app)
+    
+    # Request IDs, phase timings and the per-request JSON log record
+    init_request_context(app)
+    
+    # Per-endpoint request metrics and subsystem gauges for /api/metrics
+    init_metrics(app)
+    register_collector('db_pool', get_pool_stats)
+    register_collector('db_writer', get_writer_stats)
+    register_collector('hashing', get_hashing_stats)
+    register_collector('user_cache', get_user_cache_stats)
+    register_collector('search_cache', get_search_cache_stats)
+    register_collector('logging', get_logging_stats)
+    register_collector('fragment_cache', get_fragment_cache_stats)
+    register_collector('response_cache', get_response_cache_stats)
+    register_collector('rate_limit', get_rate_limit_stats)
+    register_collector('user_store', get_user_store_stats)
+    register_collector('login_audit', get_login_audit_stats)
+    
+    # Compiled template cache, cached navbar/footer fragments and breadcrumbs
+    with startup_step('templating'):
+        init_templating(app)
+    
+    # Bundled, fingerprinted and precompressed static assets
+    with startup_step('assets'):
+        init_assets(app)
+    
+    # Cached public pages with ETags and per-route Cache-Control
+    with startup_step('response_cache'):
+        init_response_cache(app)
+    
+    # Server-side sessions (backend chosen in config.ini)
+    with startup_step('session_store'):
+        init_session_store(app)
+    
+    # Login/registration throttling, checked before any password hashing
+    with startup_step('rate_limit'):
+        init_rate_limit()
+    
+    # Login events, buffered and written in batches off the request path
+    with startup_step('login_audit'):
+        init_login_audit()
+    
+    # Flush queued writes and close pooled connections when the process exits
+    atexit.register(shutdown_db)
+    atexit.register(shutdown_db_executor)
+    atexit.register(shutdown_hashing)
+    # Registered last so buffered login events are written before the database shuts down
+    atexit.register(shutdown_login_audit)
+    
+    # Register blueprints (their form and hashing dependencies load on first use)
+    with startup_step('blueprints'):
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(main_bp)
+        app.register_blueprint(api_bp)
     logger.info("Blueprints registered")
     
     # Error handlers
     @app.errorhandler(404)
     def not_found_error(error):
-        logger.warning(f"404 error: {error}")
+        logger.warning("404 error: %s", error)
         return render_template('errors/404.html'), 404
     
+    @app.errorhandler(HashingBusyError)
+    def service_busy_error(error):
+        logger.warning("503 error: %s", error)
+        headers = {'Retry-After': '1'}
+        if request.path.startswith('/api/'):
+            return jsonify({
+                'success': False,
+                'message': 'Service busy, please retry'
+            }), 503, headers
+        return render_template('errors/503.html'), 503, headers
+    
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f"500 error: {error}")
+        logger.error("500 error: %s", error)
         return render_template('errors/500.html'), 500
     
-    # Context processor for app name
+    # Context processor for app name (O(1) read from the config snapshot)
     @app.context_processor
     def inject_app_name():
-        return {
-            'app_name': get_config('APP', 'app_name', 'Flask App')
-        }
+        return {'app_name': get_settings().APP.app_name}
+    
+    # Hot reload: cached pages may show reloaded values, so drop them
+    on_config_reload(lambda settings: clear_response_cache())
+    start_config_watcher(get_settings().APP.config_reload_interval)
+    
+    # [APP] startup_profile logs the time spent in each step above
+    if get_settings().APP.startup_profile:
+        log_startup_profile(logger, time.perf_counter() - started)
     
     return app
 
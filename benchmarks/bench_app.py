@@ -0,0 +1,385 @@
+"""
+Load-testing and benchmark harness for the auth and API hot paths.
+
+Drives create_app() in-process (Flask test client) and/or over a local WSGI
+server with a configurable number of concurrent clients, reports requests
+per second and latency percentiles per scenario, and can save or compare
+against a baseline JSON file so regressions are caught.
+
+Usage:
+    python benchmarks/bench_app.py --users 100000 --concurrency 16
+    python benchmarks/bench_app.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_app.py --compare benchmarks/baseline.json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+BENCH_PASSWORD = 'bench-password'
+
+# Scenario name -> (method, path, needs_login, expected status codes)
+SCENARIOS = {
+    'status': ('GET', '/api/status', False, (200,)),
+    'about': ('GET', '/about', False, (200,)),
+    'login_page': ('GET', '/login', False, (200,)),
+    'register_page': ('GET', '/register', False, (200,)),
+    'login': ('POST', '/login', False, (302,)),
+    'register': ('POST', '/register', False, (302,)),
+    'index': ('GET', '/', True, (200,)),
+    'api_user': ('GET', '/api/user', True, (200,)),
+}
+
+def percentile(sorted_values, q):
+    """
+    Get a percentile from an already sorted list.
+    
+    Args:
+        sorted_values: Sorted list of numbers
+        q: Percentile between 0 and 100
+    
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def configure(workdir, args):
+    """
+    Point the app at a scratch working directory before create_app().
+    
+    Args:
+        workdir: Directory for the benchmark database and logs
+        args: Parsed command line arguments
+    """
+    os.chdir(workdir)
+    from utils.config_parser import set_config_override
+    set_config_override('LOGGING', 'log_level', args.log_level)
+    # Every simulated client shares 127.0.0.1; measure the app, not the limiter
+    set_config_override('RATE_LIMIT', 'enabled', 'false')
+    if args.user_store:
+        set_config_override('USER_STORE', 'backend', args.user_store)
+
+def seed_users(count, chunk_size=50000):
+    """
+    Seed the user store with bench_user_<n> accounts in large batches.
+    
+    Every account shares one precomputed password hash so seeding measures
+    the database, not the hash function. Existing accounts are skipped, so
+    an interrupted seed resumes where it stopped.
+    
+    Args:
+        count: Number of users to create
+        chunk_size: Users per create_many() batch
+    """
+    from models.user_repository import get_user_repository
+    from utils.hashing import hash_password
+    
+    repository = get_user_repository()
+    if count and repository.get_by_username(f"bench_user_{count - 1}") is not None:
+        print(f"  Dataset already has {count} bench users")
+        return
+    
+    password_hash = hash_password(BENCH_PASSWORD)
+    start = time.perf_counter()
+    created = 0
+    for offset in range(0, count, chunk_size):
+        end = min(count, offset + chunk_size)
+        created += repository.create_many(
+            (f"bench_user_{i}", password_hash) for i in range(offset, end))
+    elapsed = time.perf_counter() - start
+    print(f"  Seeded {created} users in {elapsed:.2f}s ({created / max(elapsed, 1e-9):,.0f} rows/s)")
+
+class InProcessClient:
+    """Benchmark client backed by the Flask test client."""
+    
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+    
+    def request(self, method, path, data=None):
+        """Issue a request and return its status code."""
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code
+    
+    def clear_cookies(self):
+        """Start a new session, like a client that has never logged in."""
+        self.client = self.app.test_client()
+
+class WSGIClient:
+    """Benchmark client that talks HTTP to a local WSGI server."""
+    
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), self._NoRedirect())
+    
+    def request(self, method, path, data=None):
+        """Issue a request and return its status code."""
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+    
+    def clear_cookies(self):
+        """Start a new session, like a client that has never logged in."""
+        self.cookies.clear()
+
+def form_data(scenario, worker, iteration, user_count):
+    """Build the POST body for a scenario request."""
+    if scenario == 'login':
+        username = f"bench_user_{(worker * 7919 + iteration) % max(1, user_count)}"
+        return {'username': username, 'password': BENCH_PASSWORD}
+    if scenario == 'register':
+        username = f"bench_new_{os.getpid()}_{time.time_ns()}_{worker}_{iteration}"
+        return {'username': username, 'password': BENCH_PASSWORD,
+                'confirm_password': BENCH_PASSWORD}
+    return None
+
+def run_scenario(name, make_client, concurrency, total_requests, user_count):
+    """
+    Run one scenario with concurrent clients and collect latencies.
+    
+    Args:
+        name: Scenario name from SCENARIOS
+        make_client: Callable returning a new client
+        concurrency: Number of concurrent clients
+        total_requests: Requests to issue across all clients
+        user_count: Number of seeded users
+    
+    Returns:
+        Dictionary with throughput, error counts and latency percentiles
+    """
+    method, path, needs_login, expected = SCENARIOS[name]
+    per_worker = max(1, total_requests // concurrency)
+    barrier = threading.Barrier(concurrency)
+    
+    def worker(worker_id):
+        client = make_client()
+        if needs_login:
+            client.request('POST', '/login', form_data('login', worker_id, 0, user_count))
+        latencies, errors, rejected = [], 0, 0
+        barrier.wait()
+        for i in range(per_worker):
+            data = form_data(name, worker_id, i + 1, user_count)
+            if name == 'login':
+                # A logged-in session would only be redirected, never
+                # reaching password verification
+                client.clear_cookies()
+            start = time.perf_counter()
+            status = client.request(method, path, data)
+            latencies.append(time.perf_counter() - start)
+            if status == 503:
+                rejected += 1
+            elif status not in expected:
+                errors += 1
+        return latencies, errors, rejected
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(l for result in results for l in result[0])
+    return {
+        'requests': len(latencies),
+        'errors': sum(result[1] for result in results),
+        'rejected': sum(result[2] for result in results),
+        'elapsed_s': round(elapsed, 4),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+def start_wsgi_server(app):
+    """
+    Serve the app on a random local port in a background thread.
+    
+    Returns:
+        Tuple of (server, base_url)
+    """
+    import logging
+    from werkzeug.serving import make_server
+    # Per-request access lines would dominate the measurement
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def compare(results, baseline_path, tolerance):
+    """
+    Compare results with a saved baseline.
+    
+    A scenario regresses if its throughput drops or its p95 latency grows
+    by more than the tolerance.
+    
+    Args:
+        results: Results from this run
+        baseline_path: Path to a baseline JSON file
+        tolerance: Allowed relative change, e.g. 0.2 for 20%
+    
+    Returns:
+        List of regression messages
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    
+    regressions = []
+    for mode, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(mode, {}).get(name)
+            if not previous:
+                continue
+            if current['rps'] < previous['rps'] * (1 - tolerance):
+                regressions.append(f"{mode}/{name}: {current['rps']} req/s "
+                                   f"(baseline {previous['rps']})")
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p95 {current['p95_ms']} ms "
+                                   f"(baseline {previous['p95_ms']})")
+    return regressions
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--mode', choices=['inproc', 'wsgi', 'both'], default='both',
+                        help='Drive the app in-process, over a local WSGI server, or both')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=1000,
+                        help='Requests per scenario across all clients')
+    parser.add_argument('--hash-requests', type=int, default=100,
+                        help='Requests for the login/register scenarios (password hashing)')
+    parser.add_argument('--users', type=int, default=10000, help='Seeded dataset size')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='Comma-separated scenarios to run')
+    parser.add_argument('--user-store', choices=['sqlite', 'memory', 'sharded'],
+                        help='Override [USER_STORE] backend')
+    parser.add_argument('--workdir', help='Directory for the benchmark database and logs '
+                                          '(reused between runs; defaults to a temp dir)')
+    parser.add_argument('--log-level', default='WARNING', help='App log level during the run')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Compare results with a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression when comparing (default 0.2)')
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark and return a process exit code."""
+    args = parse_args()
+    # Resolve user paths before switching to the scratch directory
+    if args.save_baseline:
+        args.save_baseline = os.path.abspath(args.save_baseline)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='bench_'))
+    os.makedirs(workdir, exist_ok=True)
+    configure(workdir, args)
+    
+    from app import create_app
+    
+    print("=" * 60)
+    print("Benchmark")
+    print("=" * 60)
+    print(f"  Working directory: {workdir}")
+    
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    seed_users(args.users)
+    
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}")
+        return 2
+    
+    modes = ['inproc', 'wsgi'] if args.mode == 'both' else [args.mode]
+    results = {}
+    for mode in modes:
+        server = None
+        if mode == 'wsgi':
+            server, base_url = start_wsgi_server(app)
+            make_client = lambda: WSGIClient(base_url)
+        else:
+            make_client = lambda: InProcessClient(app)
+        
+        print()
+        print(f"Mode: {mode} (concurrency {args.concurrency})")
+        print(f"  {'scenario':<14} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'errors':>7} {'503s':>6}")
+        results[mode] = {}
+        try:
+            for name in scenarios:
+                total = args.hash_requests if name in ('login', 'register') else args.requests
+                result = run_scenario(name, make_client, args.concurrency, total, args.users)
+                results[mode][name] = result
+                print(f"  {name:<14} {result['rps']:>10,.1f} {result['p50_ms']:>9.2f} "
+                      f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                      f"{result['errors']:>7} {result['rejected']:>6}")
+        finally:
+            if server is not None:
+                server.shutdown()
+    
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'hash_requests': args.hash_requests,
+            'users': args.users,
+        },
+        'results': results,
+    }
+    
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print()
+        print(f"Baseline saved to {args.save_baseline}")
+    
+    exit_code = 0
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        print()
+        if regressions:
+            print(f"✗ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            exit_code = 1
+        else:
+            print(f"✓ No regressions beyond {args.tolerance:.0%}")
+    
+    print("=" * 60)
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
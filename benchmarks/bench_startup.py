@@ -0,0 +1,162 @@
+"""
+Cold-start benchmark for worker startup.
+
+Starts fresh interpreters that import the app and call create_app() against
+an already initialized database (the case when a worker is added), reports
+import and create_app() times, and fails when the median startup time
+(import + create_app, excluding interpreter boot) exceeds the target.
+
+With --profile, one run is made under `python -X importtime` and the
+slowest modules and every create_app() step are reported.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 10 --target-ms 500
+    python benchmarks/bench_startup.py --profile
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line with its timings
+CHILD_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {base_dir!r})
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+from utils.startup import get_startup_steps
+print(json.dumps({{
+    'import': imported - start,
+    'create_app': created - imported,
+    'steps': get_startup_steps(),
+}}))
+'''
+
+# Module prefixes that belong to this application
+APP_MODULES = ('app', 'utils', 'routes', 'models', 'forms')
+
+def run_child(workdir, extra_args=()):
+    """
+    Start one interpreter, create the app and collect its timings.
+    
+    Args:
+        workdir: Working directory holding the database and logs
+        extra_args: Extra interpreter arguments (e.g. -X importtime)
+    
+    Returns:
+        Tuple of (timings dictionary, wall time in seconds, stderr text)
+    """
+    env = dict(os.environ, APP_CONFIG__LOGGING__LOG_LEVEL='WARNING')
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_args, '-c', CHILD_SCRIPT.format(base_dir=BASE_DIR)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=False)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, wall, result.stderr
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output.
+    
+    Args:
+        stderr: Child stderr text
+    
+    Returns:
+        List of (module, self seconds, cumulative seconds)
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return modules
+
+def profile(workdir, top):
+    """
+    Report per-module import times and create_app() step times.
+    
+    Args:
+        workdir: Working directory holding the database and logs
+        top: Number of slowest modules to list
+    """
+    timings, wall, stderr = run_child(workdir, ('-X', 'importtime'))
+    modules = parse_importtime(stderr)
+    
+    print(f"Wall {wall * 1000:.1f} ms, import {timings['import'] * 1000:.1f} ms, "
+          f"create_app {timings['create_app'] * 1000:.1f} ms (import times inflated by profiling)")
+    print(f"\nSlowest {top} modules by self time:")
+    print(f"  {'module':<48}{'self ms':>10}{'cum ms':>10}")
+    for name, self_time, cumulative in sorted(modules, key=lambda m: m[1], reverse=True)[:top]:
+        print(f"  {name:<48}{self_time * 1000:>10.2f}{cumulative * 1000:>10.2f}")
+    
+    print("\nApplication modules (cumulative, includes their dependencies):")
+    for name, self_time, cumulative in modules:
+        if name.split('.')[0] in APP_MODULES:
+            print(f"  {name:<48}{self_time * 1000:>10.2f}{cumulative * 1000:>10.2f}")
+    
+    print("\ncreate_app() steps:")
+    for name, seconds in timings['steps']:
+        print(f"  {name:<48}{seconds * 1000:>10.2f}")
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=10, help='Cold starts to measure')
+    parser.add_argument('--target-ms', type=float, default=500.0,
+                        help='Maximum median import + create_app() time')
+    parser.add_argument('--profile', action='store_true',
+                        help='Report per-module import and per-step init times')
+    parser.add_argument('--top', type=int, default=25, help='Modules listed by --profile')
+    parser.add_argument('--workdir', help='Directory for the database and logs '
+                                          '(defaults to a temp dir)')
+    return parser.parse_args()
+
+def main():
+    """Run the cold-start benchmark."""
+    args = parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_startup_')
+    os.makedirs(workdir, exist_ok=True)
+    
+    # First start creates the database, schema and caches; not measured
+    run_child(workdir)
+    
+    if args.profile:
+        profile(workdir, args.top)
+        return 0
+    
+    imports, creates, totals, walls = [], [], [], []
+    for _ in range(args.runs):
+        timings, wall, _ = run_child(workdir)
+        imports.append(timings['import'])
+        creates.append(timings['create_app'])
+        totals.append(timings['import'] + timings['create_app'])
+        walls.append(wall)
+    
+    print(f"Cold start over {args.runs} runs (working directory: {workdir})")
+    print(f"  {'':<14}{'median ms':>12}{'max ms':>12}")
+    for label, values in (('import', imports), ('create_app', creates),
+                          ('startup', totals), ('process wall', walls)):
+        print(f"  {label:<14}{statistics.median(values) * 1000:>12.1f}{max(values) * 1000:>12.1f}")
+    
+    median = statistics.median(totals) * 1000
+    if median > args.target_ms:
+        print(f"FAIL: median startup {median:.1f} ms exceeds target {args.target_ms:.0f} ms")
+        return 1
+    print(f"OK: median startup {median:.1f} ms within target {args.target_ms:.0f} ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
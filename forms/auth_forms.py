@@ -2,7 +2,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, EqualTo, ValidationError
-from models.user import get_user_by_username
+from models.user import username_exists
 
 class RegistrationForm(FlaskForm):
     """User registration form."""
@@ -16,8 +16,7 @@ class RegistrationForm(FlaskForm):
     
     def validate_username(self, username):
         """Check if username already exists."""
-        user = get_user_by_username(username.data)
-        if user:
+        if username_exists(username.data):
             raise ValidationError('Username already exists. Please choose a different one.')
 
 class LoginForm(FlaskForm):
@@ -0,0 +1,283 @@
+"""
+Login audit trail written in batches by a background thread.
+
+Login routes call record_login_event(), which only appends to a bounded
+in-memory queue, so the request path never waits for a database write.
+A flusher thread drains the queue into the login_events table in one
+transaction per batch (when batch_size events are buffered or
+flush_interval_ms after the first one arrived) and updates
+users.last_login_at for the successful logins in the batch. When the
+queue is full new events are dropped and counted, never blocking a login.
+"""
+import os
+import queue
+import threading
+import time
+from models.user import get_user_by_username
+from models.user_repository import get_user_repository
+from utils.async_database import run_in_db_executor
+from utils.config_parser import get_settings
+from utils.database import execute_query, execute_many
+import logging
+
+logger = logging.getLogger('flask_app')
+
+# Event types stored in login_events.event
+LOGIN_EVENTS = ('login', 'failure', 'logout')
+
+_INSERT = ("INSERT INTO login_events (user_id, username, event, ip, created_at) "
+           "VALUES (?, ?, ?, ?, ?)")
+
+_FLUSH_STOP = object()
+
+# Created by init_login_audit(); None while auditing is disabled
+_queue = None
+_thread = None
+_lock = threading.Lock()
+
+# Counters for /api/metrics
+_stats = {
+    'recorded': 0,
+    'dropped': 0,
+    'written': 0,
+    'batches': 0,
+    'errors': 0,
+    'max_batch_size': 0,
+}
+_stats_lock = threading.Lock()
+
+# time.monotonic() of the last retention sweep
+_last_prune = 0.0
+
+def _timestamp(seconds):
+    """Format epoch seconds like SQLite's CURRENT_TIMESTAMP (UTC)."""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds))
+
+def _ensure_flusher():
+    """Start the flusher thread if it is not running (e.g. after a fork)."""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        with _lock:
+            if _thread is None or not _thread.is_alive():
+                _thread = threading.Thread(target=_flush_loop, args=(_queue,),
+                                           name='login-audit', daemon=True)
+                _thread.start()
+
+def record_login_event(event, username, user_id=None, ip=None):
+    """
+    Queue a login event for the next batch; never blocks.
+    
+    Args:
+        event: One of LOGIN_EVENTS
+        username: Username the event is about
+        user_id: User ID if known (failed logins are resolved when flushed)
+        ip: Client IP address
+    """
+    if _queue is None:
+        return
+    _ensure_flusher()
+    try:
+        _queue.put_nowait((time.time(), event, user_id, username, ip))
+    except queue.Full:
+        with _stats_lock:
+            _stats['dropped'] += 1
+        return
+    with _stats_lock:
+        _stats['recorded'] += 1
+
+def _write_batch(batch):
+    """
+    Insert a batch of events in one transaction and update last logins.
+    
+    Args:
+        batch: List of (time, event, user_id, username, ip) tuples
+    """
+    rows = []
+    last_logins = {}
+    for created, event, user_id, username, ip in batch:
+        if user_id is None:
+            # Failed logins carry only the name; attribute them to the
+            # account (from the user cache) so its owner can see them
+            user = get_user_by_username(username)
+            user_id = user['id'] if user else None
+        created_at = _timestamp(created)
+        rows.append((user_id, username, event, ip, created_at))
+        if event == 'login':
+            last_logins[user_id] = created_at
+    
+    execute_many(_INSERT, rows)
+    if last_logins:
+        get_user_repository().set_last_logins(
+            [(created_at, user_id) for user_id, created_at in last_logins.items()])
+
+def _prune(retention_days):
+    """Delete events older than the retention period, at most once an hour."""
+    global _last_prune
+    now = time.monotonic()
+    if not retention_days or now - _last_prune < 3600:
+        return
+    _last_prune = now
+    cutoff = _timestamp(time.time() - retention_days * 86400)
+    # execute_many() reports the affected row count; execute_query() only lastrowid
+    deleted = execute_many("DELETE FROM login_events WHERE created_at < ?", [(cutoff,)])
+    logger.debug("Pruned %d login events before %s", deleted, cutoff)
+
+def _flush_loop(event_queue):
+    """Drain the event queue in batches until stopped."""
+    while True:
+        item = event_queue.get()
+        if item is _FLUSH_STOP:
+            return
+        settings = get_settings().LOGIN_AUDIT
+        batch = [item]
+        stop = False
+        deadline = time.monotonic() + settings.flush_interval_ms / 1000.0
+        while len(batch) < settings.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    item = event_queue.get(timeout=remaining)
+                else:
+                    item = event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FLUSH_STOP:
+                stop = True
+                break
+            batch.append(item)
+        
+        try:
+            _write_batch(batch)
+            _prune(settings.retention_days)
+            with _stats_lock:
+                _stats['written'] += len(batch)
+                _stats['batches'] += 1
+                _stats['max_batch_size'] = max(_stats['max_batch_size'], len(batch))
+        except Exception as e:
+            with _stats_lock:
+                _stats['errors'] += len(batch)
+            logger.error("Failed to write %d login events: %s", len(batch), e)
+        if stop:
+            return
+
+def shutdown_login_audit(timeout=5):
+    """
+    Write buffered events and stop the flusher thread.
+    
+    Registered as an exit hook by create_app() so it runs before the
+    database writer shuts down.
+    
+    Args:
+        timeout: Seconds to wait for the flusher to finish
+    """
+    global _thread
+    with _lock:
+        thread, _thread = _thread, None
+    if thread is not None and thread.is_alive():
+        _queue.put(_FLUSH_STOP)
+        thread.join(timeout)
+
+def get_recent_logins(user_id, limit=20):
+    """
+    Get a user's most recent login events, newest first.
+    
+    Read from the (user_id, created_at) index. Events still buffered for
+    the next batch are not included.
+    
+    Args:
+        user_id: User's ID
+        limit: Maximum number of events
+    
+    Returns:
+        List of rows with event, ip and created_at
+    """
+    query = ("SELECT event, ip, created_at FROM login_events WHERE user_id = ? "
+             "ORDER BY created_at DESC, id DESC LIMIT ?")
+    return execute_query(query, (user_id, limit), fetch_all=True)
+
+async def get_recent_logins_async(user_id, limit=20):
+    """
+    Async variant of get_recent_logins().
+    
+    Args:
+        user_id: User's ID
+        limit: Maximum number of events
+    
+    Returns:
+        List of rows with event, ip and created_at
+    """
+    return await run_in_db_executor(get_recent_logins, user_id, limit)
+
+def get_last_login(user_id):
+    """
+    Get the time of a user's last successful login.
+    
+    Args:
+        user_id: User's ID
+    
+    Returns:
+        Timestamp string (UTC) or None
+    """
+    return get_user_repository().get_last_login(user_id)
+
+async def get_last_login_async(user_id):
+    """
+    Async variant of get_last_login().
+    
+    Args:
+        user_id: User's ID
+    
+    Returns:
+        Timestamp string (UTC) or None
+    """
+    return await run_in_db_executor(get_last_login, user_id)
+
+def get_login_audit_stats():
+    """
+    Get login audit metrics for monitoring.
+    
+    Returns:
+        Dictionary with recorded, dropped and written event counts, batch
+        counts and queue depth
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    batches = stats['batches']
+    stats['avg_batch_size'] = stats['written'] / batches if batches else 0.0
+    stats['queue_depth'] = _queue.qsize() if _queue is not None else 0
+    return stats
+
+def init_login_audit():
+    """
+    Create the login event queue.
+    
+    Reads [LOGIN_AUDIT] from config.ini. The flusher thread starts with
+    the first event.
+    """
+    global _queue
+    settings = get_settings().LOGIN_AUDIT
+    if not settings.enabled:
+        _queue = None
+        logger.info("Login audit disabled")
+        return
+    if _queue is None:
+        _queue = queue.Queue(maxsize=settings.max_buffer)
+    logger.info("Login audit enabled: batches of %d every %d ms, buffer %d, retention %d days",
+                settings.batch_size, settings.flush_interval_ms, settings.max_buffer,
+                settings.retention_days)
+
+def _reset_after_fork():
+    """
+    Give a forked child process its own queue and flusher.
+    
+    Events still buffered in the parent are written by the parent.
+    """
+    global _queue, _thread, _lock, _stats_lock
+    _lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _thread = None
+    if _queue is not None:
+        _queue = queue.Queue(maxsize=_queue.maxsize)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
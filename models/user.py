@@ -1,10 +1,193 @@
 """User model with authentication functions."""
-from werkzeug.security import generate_password_hash, check_password_hash
-from utils.database import execute_query
+from models.user_repository import get_user_repository, fold_username, USER_FIELDS
+from utils.hashing import hash_password, check_password, HashingBusyError
+from utils.async_database import run_in_db_executor
+from utils.cache import TTLCache, MISSING
+from utils.prefix_cache import PrefixCache
+from utils.config_parser import get_config_int
+from utils.request_context import count_event
+from flask import g, has_request_context
 import logging
 
 logger = logging.getLogger('flask_app')
 
+# User lookup cache keyed by ('username', name) and ('id', id), plus
+# ('login', name) for rows with the password hash and ('exists', name)
+# for availability checks; a cached None records a user that does not
+# exist
+_user_cache = TTLCache(get_config_int('CACHE', 'user_cache_size', 10000),
+                       get_config_int('CACHE', 'user_cache_ttl', 300))
+_negative_ttl = get_config_int('CACHE', 'user_cache_negative_ttl', 30)
+_cache_generation = 0
+_cache_counters = {'negative_hits': 0, 'invalidations': 0, 'identity_map_hits': 0,
+                   'db_lookups': 0}
+
+# Prefix search results, as (folded username, row) pairs in a trie
+_prefix_cache = PrefixCache(get_config_int('CACHE', 'search_cache_size', 10000),
+                            get_config_int('CACHE', 'search_cache_ttl', 60))
+
+# Search modes accepted by search_users()
+SEARCH_MODES = ('prefix', 'fuzzy')
+
+class User:
+    """
+    Compact user record returned by the lookup functions.
+    
+    Smaller than a sqlite3.Row to cache and hold per request. password_hash
+    is only set on records loaded for verify_user(); every other lookup
+    leaves it None. user['field'] works like it did on rows.
+    """
+    
+    __slots__ = ('id', 'username', 'created_at', 'password_hash')
+    
+    def __init__(self, id, username, created_at=None, password_hash=None):
+        self.id = id
+        self.username = username
+        self.created_at = created_at
+        self.password_hash = password_hash
+    
+    @classmethod
+    def from_row(cls, row, with_hash=False):
+        """
+        Build a User from a repository row.
+        
+        Args:
+            row: Row with USER_COLUMNS (and password_hash if with_hash), or None
+            with_hash: Keep the password hash
+        
+        Returns:
+            User, or None for a missing row
+        """
+        if row is None:
+            return None
+        return cls(row['id'], row['username'], row['created_at'],
+                   row['password_hash'] if with_hash else None)
+    
+    def without_hash(self):
+        """Return this user with the password hash dropped."""
+        return User(self.id, self.username, self.created_at)
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __repr__(self):
+        return f"User(id={self.id!r}, username={self.username!r})"
+
+def _identity_map():
+    """
+    Return the current request's identity map, or None outside of a request.
+    
+    Maps ('id', id) and ('username', name) to the User (or None) already
+    looked up during this request, so repeated lookups cost no cache or
+    database access. Lives on flask.g and is discarded with the request.
+    """
+    if not has_request_context():
+        return None
+    identity_map = g.get('_user_identity_map')
+    if identity_map is None:
+        identity_map = g._user_identity_map = {}
+    return identity_map
+
+def _identity_lookup(key, load):
+    """
+    Serve a lookup from the identity map, or load it and remember the result.
+    
+    Args:
+        key: ('id', id) or ('username', name)
+        load: Callable performing the cached lookup
+    
+    Returns:
+        User or None
+    """
+    identity_map = _identity_map()
+    if identity_map is None:
+        return load()
+    if key in identity_map:
+        _cache_counters['identity_map_hits'] += 1
+        count_event('user_lookups_saved')
+        return identity_map[key]
+    user = load()
+    identity_map[key] = user
+    if user is not None:
+        identity_map[('id', user.id)] = identity_map[('username', user.username)] = user
+    return user
+
+def _load(key, fetch, with_hash=False):
+    """Fetch a user from the repository as a User, counting the round trip."""
+    _cache_counters['db_lookups'] += 1
+    count_event('user_db_lookups')
+    return User.from_row(fetch(key[1]), with_hash)
+
+def _cache_lookup(key):
+    """Return a cached user row, None for a cached miss, or MISSING."""
+    user = _user_cache.get(key)
+    if user is None:
+        _cache_counters['negative_hits'] += 1
+    return user
+
+def _cache_store(key, user, generation):
+    """
+    Cache a lookup result under every key it can be found by.
+    
+    Results fetched before an invalidation (generation changed) are
+    dropped so a concurrent create_user cannot be masked by a stale miss.
+    """
+    if generation != _cache_generation:
+        return
+    if user is None:
+        _user_cache.set(key, None, ttl=_negative_ttl)
+    elif key[0] in ('login', 'exists'):
+        _user_cache.set(key, user)
+    else:
+        _user_cache.set(('username', user.username), user)
+        _user_cache.set(('id', user.id), user)
+
+def invalidate_user_cache(username=None, user_id=None):
+    """
+    Drop cached entries for a user after it changes.
+    
+    Args:
+        username: Username whose entry should be dropped
+        user_id: User ID whose entry should be dropped
+    """
+    global _cache_generation
+    _cache_generation += 1
+    _cache_counters['invalidations'] += 1
+    if username is not None:
+        _user_cache.delete(('username', username))
+        _user_cache.delete(('login', username))
+        _user_cache.delete(('exists', username))
+        _prefix_cache.invalidate(fold_username(username))
+    if user_id is not None:
+        _user_cache.delete(('id', user_id))
+    
+    identity_map = _identity_map()
+    if identity_map is not None:
+        identity_map.pop(('username', username), None)
+        identity_map.pop(('id', user_id), None)
+
+def get_user_cache_stats():
+    """
+    Get user cache metrics for monitoring.
+    
+    Returns:
+        Dictionary with hit, miss, eviction and invalidation counts
+    """
+    stats = _user_cache.stats()
+    stats.update(_cache_counters)
+    return stats
+
+def get_search_cache_stats():
+    """
+    Get prefix search cache metrics for monitoring.
+    
+    Returns:
+        Dictionary with hit, filtered hit, miss and invalidation counts
+    """
+    return _prefix_cache.stats()
+
 def create_user(username, password):
     """
     Create a new user with hashed password.
@@ -15,15 +198,20 @@ def create_user(username, password):
         
     Returns:
         User ID if successful, None if username already exists
+        
+    Raises:
+        HashingBusyError: If the hashing pool is saturated
     """
     try:
-        password_hash = generate_password_hash(password)
-        query = "INSERT INTO users (username, password_hash) VALUES (?, ?)"
-        user_id = execute_query(query, (username, password_hash), commit=True)
-        logger.info(f"User created: {username}")
+        password_hash = hash_password(password)
+        user_id = get_user_repository().create(username, password_hash)
+        invalidate_user_cache(username=username, user_id=user_id)
+        logger.info("User created: %s", username)
         return user_id
+    except HashingBusyError:
+        raise
     except Exception as e:
-        logger.error(f"Error creating user {username}: {str(e)}")
+        logger.error("Error creating user %s: %s", username, e)
         return None
 
 def get_user_by_username(username):
@@ -34,10 +222,62 @@ def get_user_by_username(username):
         username: User's username
         
     Returns:
-        User row or None
+        User or None
     """
-    query = "SELECT * FROM users WHERE username = ?"
-    return execute_query(query, (username,), fetch_one=True)
+    key = ('username', username)
+    return _identity_lookup(key, lambda: _get_user(key))
+
+def _get_user(key):
+    """Look up ('username', name) or ('id', id) in the user cache, then the store."""
+    user = _cache_lookup(key)
+    if user is not MISSING:
+        return user
+    
+    generation = _cache_generation
+    repository = get_user_repository()
+    if key[0] == 'id':
+        user = _load(key, repository.get_by_id)
+        # Unknown IDs are not cached: they only come from stale sessions
+        if user is not None:
+            _cache_store(key, user, generation)
+    else:
+        user = _load(key, repository.get_by_username)
+        _cache_store(key, user, generation)
+    return user
+
+def username_exists(username):
+    """
+    Check whether a username is taken.
+    
+    Answered from the UNIQUE username index without loading the row.
+    
+    Args:
+        username: Username to check
+    
+    Returns:
+        True if a user with that name exists
+    """
+    key = ('exists', username)
+    exists = _cache_lookup(key)
+    if exists is MISSING:
+        generation = _cache_generation
+        _cache_counters['db_lookups'] += 1
+        count_event('user_db_lookups')
+        exists = get_user_repository().username_exists(username) or None
+        _cache_store(key, exists, generation)
+    return exists is not None
+
+def _get_credentials(username):
+    """Get the User including password_hash, for verify_user()."""
+    key = ('login', username)
+    user = _cache_lookup(key)
+    if user is not MISSING:
+        return user
+    
+    generation = _cache_generation
+    user = _load(key, get_user_repository().get_credentials, with_hash=True)
+    _cache_store(key, user, generation)
+    return user
 
 def verify_user(username, password):
     """
@@ -48,13 +288,20 @@ def verify_user(username, password):
         password: User's plain text password
         
     Returns:
-        User row if credentials are valid, None otherwise
+        User (without the password hash) if credentials are valid, None otherwise
+        
+    Raises:
+        HashingBusyError: If the hashing pool is saturated
     """
-    user = get_user_by_username(username)
-    if user and check_password_hash(user['password_hash'], password):
-        logger.info(f"User authenticated: {username}")
+    user = _get_credentials(username)
+    if user and check_password(user.password_hash, password):
+        logger.info("User authenticated: %s", username)
+        user = user.without_hash()
+        identity_map = _identity_map()
+        if identity_map is not None:
+            identity_map[('id', user.id)] = identity_map[('username', user.username)] = user
         return user
-    logger.warning(f"Failed authentication attempt for: {username}")
+    logger.warning("Failed authentication attempt for: %s", username)
     return None
 
 def get_user_by_id(user_id):
@@ -65,7 +312,163 @@ def get_user_by_id(user_id):
         user_id: User's ID
         
     Returns:
-        User row or None
+        User or None
+    """
+    key = ('id', user_id)
+    return _identity_lookup(key, lambda: _get_user(key))
+
+def _columns(fields):
+    """Join whitelisted field names into a column list."""
+    unknown = set(fields) - set(USER_FIELDS)
+    if unknown or not fields:
+        raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown)) or 'none given'}")
+    return ', '.join(fields)
+
+def list_users(after_id=0, limit=50, fields=USER_FIELDS):
+    """
+    Get one page of users ordered by ID (keyset pagination).
+    
+    Pages are read with WHERE id > after_id on the primary key, so the
+    cost of a page does not grow with its position.
+    
+    Args:
+        after_id: Last ID of the previous page (0 for the first page)
+        limit: Maximum number of users returned
+        fields: Fields to select, from USER_FIELDS; id is always included
+    
+    Returns:
+        List of user rows
+    """
+    columns = _columns(('id',) + tuple(f for f in fields if f != 'id'))
+    return get_user_repository().list_page(after_id, limit, columns)
+
+def iter_users(fields=USER_FIELDS, batch_size=1000):
+    """
+    Stream every user ordered by ID in constant memory.
+    
+    Args:
+        fields: Fields to select, from USER_FIELDS
+        batch_size: Rows fetched per round trip
+    
+    Returns:
+        Generator of user rows
+    """
+    return get_user_repository().iter_all(_columns(fields), batch_size)
+
+def _search_prefix(prefix, limit):
+    """Find usernames starting with prefix (case-insensitive) in name order."""
+    folded = fold_username(prefix)
+    cached = _prefix_cache.get(folded, limit)
+    if cached is not None:
+        return [row for _, row in cached]
+    
+    generation = _cache_generation
+    rows = get_user_repository().search_prefix(prefix, limit)
+    if generation == _cache_generation:
+        _prefix_cache.set(folded, limit, [(fold_username(row['username']), row) for row in rows])
+    return rows
+
+def search_users(text, mode='prefix', limit=10):
+    """
+    Search usernames for autocomplete.
+    
+    'prefix' matches names starting with text, ignoring case, from the
+    NOCASE username index with results cached in a prefix trie. 'fuzzy'
+    ranks names by trigrams shared with text using the users_fts index;
+    texts shorter than three characters use prefix matching.
+    
+    Args:
+        text: Search text
+        mode: 'prefix' or 'fuzzy'
+        limit: Maximum number of results
+    
+    Returns:
+        List of rows with id and username
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    if mode == 'fuzzy' and len(text) >= 3:
+        return get_user_repository().search_fuzzy(text, limit)
+    return _search_prefix(text, limit)
+
+async def create_user_async(username, password):
+    """
+    Async variant of create_user().
+    
+    Hashing and the insert run on the database thread pool.
+    
+    Args:
+        username: User's username
+        password: User's plain text password
+        
+    Returns:
+        User ID if successful, None if username already exists
+    """
+    return await run_in_db_executor(create_user, username, password)
+
+async def get_user_by_username_async(username):
+    """
+    Async variant of get_user_by_username().
+    
+    Args:
+        username: User's username
+        
+    Returns:
+        User or None
+    """
+    return await run_in_db_executor(get_user_by_username, username)
+
+async def verify_user_async(username, password):
+    """
+    Async variant of verify_user().
+    
+    The lookup and password check run on the database thread pool.
+    
+    Args:
+        username: User's username
+        password: User's plain text password
+        
+    Returns:
+        User if credentials are valid, None otherwise
+    """
+    return await run_in_db_executor(verify_user, username, password)
+
+async def get_user_by_id_async(user_id):
+    """
+    Async variant of get_user_by_id().
+    
+    Args:
+        user_id: User's ID
+        
+    Returns:
+        User or None
+    """
+    return await run_in_db_executor(get_user_by_id, user_id)
+
+async def list_users_async(after_id=0, limit=50, fields=USER_FIELDS):
+    """
+    Async variant of list_users().
+    
+    Args:
+        after_id: Last ID of the previous page (0 for the first page)
+        limit: Maximum number of users returned
+        fields: Fields to select, from USER_FIELDS; id is always included
+    
+    Returns:
+        List of user rows
+    """
+    return await run_in_db_executor(list_users, after_id, limit, fields)
+
+async def search_users_async(text, mode='prefix', limit=10):
+    """
+    Async variant of search_users().
+    
+    Args:
+        text: Search text
+        mode: 'prefix' or 'fuzzy'
+        limit: Maximum number of results
+    
+    Returns:
+        List of rows with id and username
     """
-    query = "SELECT * FROM users WHERE id = ?"
-    return execute_query(query, (user_id,), fetch_one=True)
+    return await run_in_db_executor(search_users, text, mode, limit)
@@ -0,0 +1,295 @@
+"""
+Bulk user import from CSV or NDJSON files.
+
+`flask import-users users.csv` streams records with a username and either
+a password (hashed here) or a Werkzeug password_hash, and loads them in
+batches:
+
+    1. invalid records (username not 3-50 characters, password shorter than
+       6) and usernames already in the file or the user store (ignoring
+       case) are skipped
+    2. passwords are hashed across a process pool, while the previous
+       batch is being inserted
+    3. each batch is inserted with one create_many() call, a single
+       transaction per database
+
+A checkpoint file records how many input records are committed, so an
+interrupted import resumes where it stopped; it is removed on success.
+Password hashing dominates the run time: expect about
+workers / (seconds per hash) users per second.
+"""
+import collections
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import click
+from models.user_repository import get_user_repository, fold_username
+from utils.config_parser import get_settings
+from utils.hashing import hash_passwords
+import logging
+
+logger = logging.getLogger('flask_app')
+
+# Input formats by file extension
+IMPORT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# Same limits as the registration form
+USERNAME_LENGTH = (3, 50)
+PASSWORD_MIN_LENGTH = 6
+
+# Passwords sent to a hashing process per task
+HASH_CHUNK_SIZE = 64
+
+# Invalid records reported individually before only being counted
+MAX_REPORTED_ERRORS = 10
+
+def _read_records(path, file_format):
+    """
+    Stream records from an input file.
+    
+    Args:
+        path: Input file
+        file_format: 'csv' (with a header row) or 'ndjson'
+    
+    Yields:
+        Tuples of (record number, dictionary or None if unparseable)
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            if 'username' not in (reader.fieldnames or ()):
+                raise click.ClickException(f"{path}: CSV header has no 'username' column")
+            yield from enumerate(reader, 1)
+            return
+        for number, line in enumerate(filter(str.strip, f), 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+
+def _validate(record):
+    """
+    Check one record.
+    
+    Returns:
+        Tuple of (username, password, password_hash), or an error message
+    """
+    if record is None:
+        return 'not a JSON object'
+    username = record.get('username')
+    password = record.get('password')
+    password_hash = record.get('password_hash')
+    if not isinstance(username, str) or not (
+            USERNAME_LENGTH[0] <= len(username) <= USERNAME_LENGTH[1]):
+        return f'username must be {USERNAME_LENGTH[0]}-{USERNAME_LENGTH[1]} characters'
+    if password_hash:
+        if not isinstance(password_hash, str) or '$' not in password_hash:
+            return 'password_hash is not a Werkzeug hash'
+        return username, None, password_hash
+    if not isinstance(password, str) or len(password) < PASSWORD_MIN_LENGTH:
+        return f'password must be at least {PASSWORD_MIN_LENGTH} characters'
+    return username, password, None
+
+def _load_checkpoint(checkpoint, path):
+    """Return the saved progress for this input file, or None."""
+    try:
+        with open(checkpoint, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('path') != os.path.abspath(path) or state.get('size') != os.path.getsize(path):
+        logger.warning("Ignoring checkpoint %s: it belongs to another input file", checkpoint)
+        return None
+    return state
+
+def _save_checkpoint(checkpoint, path, stats):
+    """Atomically record committed progress."""
+    state = {'path': os.path.abspath(path), 'size': os.path.getsize(path), 'stats': stats}
+    temporary = f'{checkpoint}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temporary, checkpoint)
+
+class _Batch:
+    """
+    Records of one batch and the futures hashing their passwords.
+    
+    Skipped records are counted per batch and added to the stats only when
+    the batch commits, so a checkpoint never includes counts for records
+    it does not cover.
+    """
+    
+    def __init__(self, last_record):
+        self.last_record = last_record
+        self.users = []
+        self.names = set()
+        self.hash_jobs = []
+        self.duplicates = 0
+        self.invalid = 0
+
+def import_users(path, file_format=None, batch_size=5000, workers=None, hash_method=None,
+                 checkpoint=None, restart=False, progress=None):
+    """
+    Import users from a CSV or NDJSON file.
+    
+    Args:
+        path: Input file with username and password (or password_hash) fields
+        file_format: 'csv' or 'ndjson' (defaults to the file extension)
+        batch_size: Records per inserted batch
+        workers: Hashing processes (defaults to the CPU count; 1 hashes inline)
+        hash_method: Werkzeug hash method (defaults to [SECURITY] hash_method)
+        checkpoint: Checkpoint file (defaults to <path>.checkpoint)
+        restart: Ignore an existing checkpoint and start from the first record
+        progress: Callable receiving the stats dictionary after each batch
+    
+    Returns:
+        Dictionary with records read, users imported, duplicates, invalid
+        records, records skipped from a checkpoint, and timings
+    """
+    file_format = file_format or IMPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format not in IMPORT_FORMATS.values():
+        raise click.ClickException(f"{path}: unknown format; pass --format csv or ndjson")
+    checkpoint = checkpoint or f'{path}.checkpoint'
+    security = get_settings().SECURITY
+    hash_method = hash_method or security.hash_method
+    workers = workers or os.cpu_count() or 1
+    repository = get_user_repository()
+    
+    stats = {'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0, 'resumed': 0,
+             'hash_wait': 0.0, 'insert_time': 0.0}
+    state = None if restart else _load_checkpoint(checkpoint, path)
+    if state is not None:
+        stats.update(state['stats'], resumed=state['stats']['read'])
+        logger.info("Resuming import of %s after %d records", path, stats['resumed'])
+    
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # Batches being hashed; their names are not in the store yet
+    in_flight = collections.deque()
+    pending_names = set()
+    start = time.perf_counter()
+    
+    def submit(batch):
+        """Start hashing a batch's passwords and queue it for insertion."""
+        passwords = [password for _, password, _ in batch.users if password is not None]
+        for offset in range(0, len(passwords), HASH_CHUNK_SIZE):
+            chunk = passwords[offset:offset + HASH_CHUNK_SIZE]
+            if executor is None:
+                batch.hash_jobs.append(hash_passwords(chunk, hash_method, security.salt_length))
+            else:
+                batch.hash_jobs.append(executor.submit(
+                    hash_passwords, chunk, hash_method, security.salt_length))
+        in_flight.append(batch)
+    
+    def commit(batch):
+        """Wait for a batch's hashes, insert it and record the checkpoint."""
+        wait_start = time.perf_counter()
+        hashes = iter([password_hash for job in batch.hash_jobs
+                       for password_hash in (job if executor is None else job.result())])
+        stats['hash_wait'] += time.perf_counter() - wait_start
+        users = [(username, password_hash or next(hashes))
+                 for username, _, password_hash in batch.users]
+        
+        insert_start = time.perf_counter()
+        inserted = repository.create_many(users) if users else 0
+        stats['insert_time'] += time.perf_counter() - insert_start
+        stats['imported'] += inserted
+        # Names taken between the duplicate check and the insert
+        stats['duplicates'] += batch.duplicates + len(users) - inserted
+        stats['invalid'] += batch.invalid
+        stats['read'] = batch.last_record
+        pending_names.difference_update(batch.names)
+        _save_checkpoint(checkpoint, path, stats)
+        if progress is not None:
+            progress(dict(stats, elapsed=time.perf_counter() - start))
+    
+    def close(batch, candidates):
+        """Drop duplicates from a batch's records, start hashing it and return the next batch."""
+        existing = repository.existing_usernames([username for username, _, _ in candidates])
+        for user in candidates:
+            name = fold_username(user[0])
+            if name in existing or name in pending_names:
+                batch.duplicates += 1
+                continue
+            pending_names.add(name)
+            batch.names.add(name)
+            batch.users.append(user)
+        submit(batch)
+        if len(in_flight) > 1:
+            commit(in_flight.popleft())
+        return _Batch(batch.last_record)
+    
+    try:
+        batch = _Batch(stats['resumed'])
+        candidates = []
+        reported = stats['invalid']
+        for number, record in _read_records(path, file_format):
+            if number <= stats['resumed']:
+                continue
+            result = _validate(record)
+            if isinstance(result, str):
+                batch.invalid += 1
+                reported += 1
+                if reported <= MAX_REPORTED_ERRORS:
+                    logger.warning("Skipping record %d of %s: %s", number, path, result)
+            else:
+                candidates.append(result)
+            batch.last_record = number
+            if number % batch_size == 0:
+                batch = close(batch, candidates)
+                candidates = []
+        close(batch, candidates)
+        while in_flight:
+            commit(in_flight.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    stats['elapsed'] = time.perf_counter() - start
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    logger.info("Imported %d users from %s in %.1fs (%d duplicates, %d invalid)",
+                stats['imported'], path, stats['elapsed'], stats['duplicates'], stats['invalid'])
+    return stats
+
+def init_user_import(app):
+    """
+    Register the 'flask import-users' command.
+    
+    Args:
+        app: Flask application
+    """
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']),
+                  help='Input format (default: from the file extension)')
+    @click.option('--batch-size', type=click.IntRange(min=1), default=5000, show_default=True,
+                  help='Records per inserted batch')
+    @click.option('--workers', type=click.IntRange(min=1),
+                  help='Password hashing processes (default: CPU count)')
+    @click.option('--hash-method', help='Werkzeug hash method (default: [SECURITY] hash_method)')
+    @click.option('--checkpoint', type=click.Path(dir_okay=False),
+                  help='Checkpoint file (default: PATH.checkpoint)')
+    @click.option('--restart', is_flag=True, help='Ignore an existing checkpoint')
+    def import_users_command(path, file_format, batch_size, workers, hash_method, checkpoint,
+                             restart):
+        """Import users from a CSV or NDJSON file of usernames and passwords."""
+        def report(stats):
+            rate = (stats['read'] - stats['resumed']) / max(stats['elapsed'], 1e-9)
+            click.echo(f"  {stats['read']:,} records: {stats['imported']:,} imported, "
+                       f"{stats['duplicates']:,} duplicates, {stats['invalid']:,} invalid "
+                       f"({rate:,.0f} records/s)")
+        
+        stats = import_users(path, file_format, batch_size, workers, hash_method, checkpoint,
+                             restart, progress=report)
+        elapsed = stats['elapsed']
+        click.echo(f"Imported {stats['imported']:,} users in {elapsed:.1f}s "
+                   f"({stats['imported'] / max(elapsed, 1e-9):,.0f} users/s)")
+        if stats['resumed']:
+            click.echo(f"  Resumed after record {stats['resumed']:,}")
+        click.echo(f"  Skipped {stats['duplicates']:,} duplicates and "
+                   f"{stats['invalid']:,} invalid records")
+        click.echo(f"  Waited {stats['hash_wait']:.1f}s for hashing, "
+                   f"{stats['insert_time']:.1f}s inserting")
@@ -0,0 +1,565 @@
+"""
+User storage behind a repository interface.
+
+models/user.py reads and writes users only through the repository
+returned by get_user_repository(). [USER_STORE] backend picks it:
+
+    sqlite   the users table of [DATABASE] database_path (default)
+    memory   process-local dictionaries, for tests and benchmarks
+    sharded  users hash-partitioned over several SQLite files, each with its
+             own connection pool and writer thread, so registrations are not
+             serialized behind a single write lock
+
+Every repository provides create, create_many, get_by_id, get_by_username,
+get_credentials, username_exists, existing_usernames, set_last_logins,
+get_last_login, list_page, iter_all, search_prefix, search_fuzzy and
+count. Returned rows support row['column'] access.
+"""
+import bisect
+import heapq
+import itertools
+import os
+import sqlite3
+import string
+import threading
+import time
+import zlib
+from contextlib import closing
+import click
+from utils.config_parser import get_settings
+from utils.database import execute_query, execute_many, iter_query, init_db
+import logging
+
+logger = logging.getLogger('flask_app')
+
+# Columns returned by user lookups; password_hash is only read by
+# get_credentials(), so the other lookups never load it
+USER_COLUMNS = 'id, username, created_at'
+
+# Fields the listing and export APIs may select; last_login_at is only
+# shown to its own user (/api/user/logins)
+USER_FIELDS = ('id', 'username', 'created_at')
+
+# Usernames hash to one of SLOTS slots and sharded IDs embed the slot
+# (id = sequence * SLOTS + slot); this also caps the number of shards
+SLOTS = 64
+
+# Names per IN (...) query in existing_usernames()
+_IN_CHUNK = 500
+
+# Case folding that matches SQLite's NOCASE collation and LIKE (ASCII only)
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Chosen on first use from [USER_STORE]
+_repository = None
+_repository_lock = threading.Lock()
+
+def fold_username(username):
+    """Case-fold a username the way SQLite's NOCASE collation does."""
+    return username.translate(_ASCII_LOWER)
+
+def username_slot(username):
+    """Slot a username hashes to; case variants share a slot."""
+    return zlib.crc32(fold_username(username).encode('utf-8')) % SLOTS
+
+def _like_prefix(prefix):
+    """Escape a prefix for LIKE ... ESCAPE '\\' and append the wildcard."""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _trigrams(text):
+    """Distinct lowercased trigrams of text, in order."""
+    text = text.lower()
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+def _fuzzy_order(text):
+    """
+    Sort key ranking rows by trigrams shared with text, then by name length.
+    
+    Unlike bm25 ranks, which depend on each FTS index's own statistics,
+    this compares rows from different shards on equal terms.
+    """
+    trigrams = _trigrams(text)
+    
+    def key(row):
+        name = fold_username(row['username'])
+        return -sum(trigram in name for trigram in trigrams), len(name), name
+    
+    return key
+
+class SQLiteUserRepository:
+    """Users table of one SQLite database."""
+    
+    # Insert with a slot-embedding ID above any ID this file has issued
+    # (sqlite_sequence also remembers deleted and moved-in IDs)
+    _SLOTTED_INSERT = f'''
+        INSERT {{or_ignore}} INTO users (id, username, password_hash) VALUES (
+            (SELECT IFNULL(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'users')
+                / {SLOTS} * {SLOTS} + {SLOTS} + ?, ?, ?)
+    '''
+    
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: Database file (defaults to [DATABASE] database_path)
+        """
+        self.db_path = db_path
+        self._fts_available = None
+    
+    def _query(self, query, params=None, **kwargs):
+        return execute_query(query, params, db_path=self.db_path, **kwargs)
+    
+    def create(self, username, password_hash, slot=None):
+        """
+        Insert a user.
+        
+        Args:
+            username: Username
+            password_hash: Password hash
+            slot: Slot to embed in the ID (sharded storage only)
+        
+        Returns:
+            New user ID
+        
+        Raises:
+            sqlite3.IntegrityError: If the username exists
+        """
+        if slot is None:
+            return self._query("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                               (username, password_hash), commit=True)
+        return self._query(self._SLOTTED_INSERT.format(or_ignore=''),
+                           (slot, username, password_hash), commit=True)
+    
+    def create_many(self, users, slotted=False):
+        """
+        Insert users in one batch, skipping usernames that exist.
+        
+        Args:
+            users: Iterable of (username, password_hash), or of
+                (slot, username, password_hash) when slotted
+            slotted: Embed the given slots in the IDs
+        
+        Returns:
+            Number of users inserted
+        """
+        if slotted:
+            return execute_many(self._SLOTTED_INSERT.format(or_ignore='OR IGNORE'), users,
+                                db_path=self.db_path)
+        return execute_many("INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+                            users, db_path=self.db_path)
+    
+    def get_by_id(self, user_id):
+        return self._query(f"SELECT {USER_COLUMNS} FROM users WHERE id = ?",
+                           (user_id,), fetch_one=True)
+    
+    def get_by_username(self, username):
+        return self._query(f"SELECT {USER_COLUMNS} FROM users WHERE username = ?",
+                           (username,), fetch_one=True)
+    
+    def get_credentials(self, username):
+        """Get the user row including password_hash, or None."""
+        return self._query(f"SELECT {USER_COLUMNS}, password_hash FROM users WHERE username = ?",
+                           (username,), fetch_one=True)
+    
+    def username_exists(self, username):
+        """Check for an exact username, from the UNIQUE username index."""
+        return self._query("SELECT 1 FROM users WHERE username = ?",
+                           (username,), fetch_one=True) is not None
+    
+    def existing_usernames(self, usernames):
+        """
+        Find which of the given usernames are taken, ignoring case.
+        
+        Args:
+            usernames: List of usernames
+        
+        Returns:
+            Set of folded (fold_username) names that exist
+        """
+        existing = set()
+        for start in range(0, len(usernames), _IN_CHUNK):
+            chunk = usernames[start:start + _IN_CHUNK]
+            rows = self._query(f"SELECT username FROM users WHERE username COLLATE NOCASE "
+                               f"IN ({', '.join('?' * len(chunk))})", chunk, fetch_all=True)
+            existing.update(fold_username(row[0]) for row in rows)
+        return existing
+    
+    def set_last_logins(self, logins):
+        """
+        Record last successful logins in one transaction.
+        
+        Args:
+            logins: List of (timestamp, user_id)
+        """
+        execute_many("UPDATE users SET last_login_at = ? WHERE id = ?", logins,
+                     db_path=self.db_path)
+    
+    def get_last_login(self, user_id):
+        row = self._query("SELECT last_login_at FROM users WHERE id = ?", (user_id,),
+                          fetch_one=True)
+        return row[0] if row else None
+    
+    def list_page(self, after_id, limit, columns):
+        return self._query(f"SELECT {columns} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                           (after_id, limit), fetch_all=True)
+    
+    def iter_all(self, columns, batch_size=1000):
+        return iter_query(f"SELECT {columns} FROM users ORDER BY id",
+                          batch_size=batch_size, db_path=self.db_path)
+    
+    def search_prefix(self, prefix, limit):
+        """Usernames starting with prefix, ignoring case, in NOCASE order."""
+        # Answered by a range scan of the NOCASE username index
+        return self._query("SELECT id, username FROM users WHERE username LIKE ? ESCAPE '\\' "
+                           "ORDER BY username COLLATE NOCASE LIMIT ?",
+                           (_like_prefix(prefix), limit), fetch_all=True)
+    
+    def search_fuzzy(self, text, limit):
+        """Usernames sharing the most trigrams with text; rows carry a rank (lower is better)."""
+        if self._fts_available is None:
+            self._fts_available = self._query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'",
+                fetch_one=True) is not None
+        if not self._fts_available:
+            return self._query("SELECT id, username, 0 AS rank FROM users "
+                               "WHERE instr(lower(username), ?) LIMIT ?",
+                               (text.lower(), limit), fetch_all=True)
+        
+        # Any shared trigram matches; bm25 ranks names containing more of
+        # them (and so the exact substring) first
+        match = ' OR '.join('"{}"'.format(trigram.replace('"', '""'))
+                            for trigram in _trigrams(text))
+        return self._query("SELECT users.id, users.username, rank FROM users_fts "
+                           "JOIN users ON users.id = users_fts.rowid "
+                           "WHERE users_fts MATCH ? ORDER BY rank LIMIT ?",
+                           (match, limit), fetch_all=True)
+    
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM users", fetch_one=True)[0]
+
+class MemoryUserRepository:
+    """Process-local user store for tests and benchmarks; lost on restart."""
+    
+    def __init__(self):
+        self._rows = {}
+        self._ids_by_username = {}
+        self._ids = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _project(row, columns):
+        return {column: row[column] for column in columns.split(', ')}
+    
+    def create(self, username, password_hash):
+        with self._lock:
+            if username in self._ids_by_username:
+                raise sqlite3.IntegrityError("UNIQUE constraint failed: users.username")
+            user_id = self._next_id
+            self._next_id += 1
+            self._rows[user_id] = {
+                'id': user_id,
+                'username': username,
+                'password_hash': password_hash,
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()),
+                'last_login_at': None,
+            }
+            self._ids_by_username[username] = user_id
+            self._ids.append(user_id)
+            return user_id
+    
+    def create_many(self, users):
+        created = 0
+        for username, password_hash in users:
+            try:
+                self.create(username, password_hash)
+                created += 1
+            except sqlite3.IntegrityError:
+                pass
+        return created
+    
+    def get_by_id(self, user_id):
+        row = self._rows.get(user_id)
+        return self._project(row, USER_COLUMNS) if row else None
+    
+    def get_by_username(self, username):
+        return self.get_by_id(self._ids_by_username.get(username))
+    
+    def get_credentials(self, username):
+        row = self._rows.get(self._ids_by_username.get(username))
+        return dict(row) if row else None
+    
+    def username_exists(self, username):
+        return username in self._ids_by_username
+    
+    def existing_usernames(self, usernames):
+        wanted = {fold_username(username) for username in usernames}
+        return {folded for folded in map(fold_username, list(self._ids_by_username))
+                if folded in wanted}
+    
+    def set_last_logins(self, logins):
+        for timestamp, user_id in logins:
+            row = self._rows.get(user_id)
+            if row is not None:
+                row['last_login_at'] = timestamp
+    
+    def get_last_login(self, user_id):
+        row = self._rows.get(user_id)
+        return row['last_login_at'] if row else None
+    
+    def list_page(self, after_id, limit, columns):
+        start = bisect.bisect_right(self._ids, after_id)
+        return [self._project(self._rows[user_id], columns)
+                for user_id in self._ids[start:start + limit]]
+    
+    def iter_all(self, columns, batch_size=1000):
+        # IDs are only appended, so indexing stays valid while users are added
+        for index in itertools.count():
+            if index >= len(self._ids):
+                return
+            yield self._project(self._rows[self._ids[index]], columns)
+    
+    def search_prefix(self, prefix, limit):
+        folded = fold_username(prefix)
+        matches = [(fold_username(name), user_id)
+                   for name, user_id in list(self._ids_by_username.items())
+                   if fold_username(name).startswith(folded)]
+        return [self._project(self._rows[user_id], 'id, username')
+                for _, user_id in heapq.nsmallest(limit, matches)]
+    
+    def search_fuzzy(self, text, limit):
+        trigrams = _trigrams(text)
+        scored = []
+        for name, user_id in list(self._ids_by_username.items()):
+            shared = sum(trigram in name.lower() for trigram in trigrams)
+            if shared:
+                scored.append((-shared, len(name), user_id))
+        return [dict(self._project(self._rows[user_id], 'id, username'), rank=rank)
+                for rank, _, user_id in heapq.nsmallest(limit, scored)]
+    
+    def count(self):
+        return len(self._rows)
+
+class ShardedUserRepository:
+    """
+    Users hash-partitioned over several SQLite files.
+    
+    A username maps to one of SLOTS slots by the CRC32 of its case-folded
+    form, and slot s lives in shard s % shard_count. IDs embed the slot, so
+    lookups by username or ID touch exactly one shard, while listing,
+    export and search fan out to every shard and merge the results.
+    """
+    
+    def __init__(self, paths):
+        """
+        Args:
+            paths: Database file of each shard, in shard order
+        """
+        if not 1 <= len(paths) <= SLOTS:
+            raise ValueError(f"Shard count must be between 1 and {SLOTS}")
+        self.shards = [SQLiteUserRepository(path) for path in paths]
+        self._stats = {'routed': 0, 'fanouts': 0}
+    
+    def _shard(self, slot):
+        self._stats['routed'] += 1
+        return self.shards[slot % len(self.shards)]
+    
+    def _fan_out(self):
+        self._stats['fanouts'] += 1
+        return self.shards
+    
+    def create(self, username, password_hash):
+        slot = username_slot(username)
+        return self._shard(slot).create(username, password_hash, slot)
+    
+    def create_many(self, users):
+        batches = [[] for _ in self.shards]
+        for username, password_hash in users:
+            slot = username_slot(username)
+            batches[slot % len(self.shards)].append((slot, username, password_hash))
+        return sum(shard.create_many(batch, slotted=True)
+                   for shard, batch in zip(self.shards, batches) if batch)
+    
+    def get_by_id(self, user_id):
+        return self._shard(user_id % SLOTS).get_by_id(user_id)
+    
+    def get_by_username(self, username):
+        return self._shard(username_slot(username)).get_by_username(username)
+    
+    def get_credentials(self, username):
+        return self._shard(username_slot(username)).get_credentials(username)
+    
+    def username_exists(self, username):
+        return self._shard(username_slot(username)).username_exists(username)
+    
+    def existing_usernames(self, usernames):
+        batches = [[] for _ in self.shards]
+        for username in usernames:
+            batches[username_slot(username) % len(self.shards)].append(username)
+        existing = set()
+        for shard, batch in zip(self.shards, batches):
+            if batch:
+                existing |= shard.existing_usernames(batch)
+        return existing
+    
+    def set_last_logins(self, logins):
+        batches = [[] for _ in self.shards]
+        for timestamp, user_id in logins:
+            batches[user_id % SLOTS % len(self.shards)].append((timestamp, user_id))
+        for shard, batch in zip(self.shards, batches):
+            if batch:
+                shard.set_last_logins(batch)
+    
+    def get_last_login(self, user_id):
+        return self._shard(user_id % SLOTS).get_last_login(user_id)
+    
+    def list_page(self, after_id, limit, columns):
+        pages = [shard.list_page(after_id, limit, columns) for shard in self._fan_out()]
+        return list(itertools.islice(heapq.merge(*pages, key=lambda row: row['id']), limit))
+    
+    def iter_all(self, columns, batch_size=1000):
+        if 'id' not in columns.split(', '):
+            columns = f'id, {columns}'
+        streams = [shard.iter_all(columns, batch_size) for shard in self._fan_out()]
+        return heapq.merge(*streams, key=lambda row: row['id'])
+    
+    def search_prefix(self, prefix, limit):
+        results = [shard.search_prefix(prefix, limit) for shard in self._fan_out()]
+        merged = heapq.merge(*results, key=lambda row: fold_username(row['username']))
+        return list(itertools.islice(merged, limit))
+    
+    def search_fuzzy(self, text, limit):
+        # Each shard's bm25 ranks come from its own FTS statistics, so the
+        # shards' best candidates are re-ranked on a shared key
+        results = itertools.chain.from_iterable(
+            shard.search_fuzzy(text, limit) for shard in self._fan_out())
+        return heapq.nsmallest(limit, results, key=_fuzzy_order(text))
+    
+    def count(self):
+        return sum(shard.count() for shard in self._fan_out())
+    
+    def stats(self):
+        return dict(self._stats, shards=len(self.shards))
+
+def shard_paths(count=None):
+    """
+    Database files of the shards.
+    
+    Args:
+        count: Number of shards (defaults to [USER_STORE] shards)
+    
+    Returns:
+        List of paths built from [USER_STORE] shard_path
+    """
+    settings = get_settings().USER_STORE
+    count = settings.shards if count is None else count
+    return [settings.shard_path.format(shard=index) for index in range(count)]
+
+def get_user_repository():
+    """Return the configured user repository, creating it on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                backend = get_settings().USER_STORE.backend
+                if backend == 'memory':
+                    _repository = MemoryUserRepository()
+                elif backend == 'sharded':
+                    _repository = ShardedUserRepository(shard_paths())
+                else:
+                    _repository = SQLiteUserRepository()
+    return _repository
+
+def get_user_store_stats():
+    """
+    Get user store metrics for monitoring.
+    
+    Returns:
+        Dictionary with routed and fan-out query counts (sharded only)
+    """
+    repository = _repository
+    return repository.stats() if isinstance(repository, ShardedUserRepository) else {}
+
+def rebalance_shards(from_count, to_count, batch_size=1000):
+    """
+    Move users to the shards their slots map to after a shard count change.
+    
+    Rows are copied before they are deleted from their old shard and
+    copies are INSERT OR IGNORE, so an interrupted run can simply be
+    repeated. Run it while the application is stopped.
+    
+    Args:
+        from_count: Shard count the data was written with
+        to_count: New shard count
+        batch_size: Rows moved per transaction
+    
+    Returns:
+        Number of users moved
+    """
+    if not 1 <= to_count <= SLOTS:
+        raise ValueError(f"Shard count must be between 1 and {SLOTS}")
+    paths = shard_paths(max(from_count, to_count))
+    for path in paths[:to_count]:
+        init_db(path)
+    
+    targets = [sqlite3.connect(path) for path in paths[:to_count]]
+    moved = 0
+    try:
+        for index, path in enumerate(paths[:from_count]):
+            if not os.path.exists(path):
+                continue
+            with closing(sqlite3.connect(path)) as source:
+                cursor = source.execute(f"SELECT * FROM users WHERE id % {SLOTS} % ? != ?",
+                                        (to_count, index))
+                columns = [description[0] for description in cursor.description]
+                insert = (f"INSERT OR IGNORE INTO users ({', '.join(columns)}) "
+                          f"VALUES ({', '.join('?' * len(columns))})")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    by_target = {}
+                    for row in rows:
+                        by_target.setdefault(row[0] % SLOTS % to_count, []).append(row)
+                    for target_index, target_rows in by_target.items():
+                        with targets[target_index]:
+                            targets[target_index].executemany(insert, target_rows)
+                    with source:
+                        source.executemany("DELETE FROM users WHERE id = ?",
+                                           [(row[0],) for row in rows])
+                    moved += len(rows)
+            logger.info("Rebalanced shard %d (%s): %d users moved so far", index, path, moved)
+    finally:
+        for target in targets:
+            target.close()
+    return moved
+
+def init_user_repository(app):
+    """
+    Create the configured user repository and prepare its storage.
+    
+    Reads [USER_STORE] from config.ini. The sharded backend migrates every
+    shard file, and 'flask rebalance-users' moves users after the shard
+    count changes.
+    
+    Args:
+        app: Flask application
+    """
+    settings = get_settings().USER_STORE
+    repository = get_user_repository()
+    if isinstance(repository, ShardedUserRepository):
+        for shard in repository.shards:
+            init_db(shard.db_path)
+    
+    @app.cli.command('rebalance-users')
+    @click.option('--from-shards', type=int, required=True,
+                  help='Shard count the users were written with')
+    def rebalance_users_command(from_shards):
+        """Move users between shards after changing [USER_STORE] shards."""
+        to_shards = get_settings().USER_STORE.shards
+        moved = rebalance_shards(from_shards, to_shards)
+        click.echo(f"Moved {moved} users from {from_shards} to {to_shards} shards")
+        if from_shards > to_shards:
+            click.echo("Shard files beyond the new count are now empty and can be removed")
+    
+    logger.info("User store: %s%s", settings.backend,
+                f" ({settings.shards} shards)" if settings.backend == 'sharded' else '')
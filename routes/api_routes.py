@@ -1,21 +1,101 @@
 """API routes for JSON endpoints."""
-from flask import Blueprint, jsonify, session
+import csv
+import io
+import json
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
+from models.user import (get_user_by_id_async, list_users_async, iter_users, search_users_async,
+                         USER_FIELDS, SEARCH_MODES)
+from models.login_events import get_recent_logins_async, get_last_login_async
+from utils.metrics import render_prometheus, get_request_summary
 import logging
 
 logger = logging.getLogger('flask_app')
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Event counts accepted by /api/user/logins
+DEFAULT_LOGIN_EVENTS = 20
+MAX_LOGIN_EVENTS = 100
+
+# Page sizes accepted by /api/users
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Result counts accepted by /api/users/search
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 50
+
+# Export formats as format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+# Streamed export bodies are flushed in chunks of about this many characters
+EXPORT_CHUNK_SIZE = 65536
+
+# Shared compact encoder; json.dumps() with options builds one per call
+_encode_json = json.JSONEncoder(separators=(',', ':')).encode
+
+def _requested_fields():
+    """
+    Parse the comma-separated ?fields= parameter.
+    
+    Returns:
+        Tuple of fields in request order (all of USER_FIELDS by default),
+        or None if an unknown field was requested
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return USER_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    if not fields or any(name not in USER_FIELDS for name in fields):
+        return None
+    return fields
+
+def _export_chunks(rows, fields, export_format):
+    """
+    Serialize rows as NDJSON or CSV in chunks of about EXPORT_CHUNK_SIZE.
+    
+    Args:
+        rows: Iterable of user rows
+        fields: Field names, in output order
+        export_format: 'ndjson' or 'csv'
+    
+    Yields:
+        Text chunks of the response body
+    """
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            buffer.write(_encode_json(dict(zip(fields, row))))
+            buffer.write('\n')
+    
+    for row in rows:
+        write_row(tuple(row[name] for name in fields))
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
 @api_bp.route('/user', methods=['GET'])
-def get_user():
+async def get_user():
     """Get current user information."""
     try:
+        user = None
         if 'user_id' in session:
+            user = await get_user_by_id_async(session['user_id'])
+        if user:
             return jsonify({
                 'success': True,
                 'user': {
-                    'id': session['user_id'],
-                    'username': session['username']
+                    'id': user['id'],
+                    'username': user['username']
                 }
             })
         else:
@@ -24,12 +104,155 @@ def get_user():
                 'message': 'Not authenticated'
             }), 401
     except Exception as e:
-        logger.error(f"API error in get_user: {str(e)}")
+        logger.error("API error in get_user: %s", e)
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error'
+        }), 500
+
+@api_bp.route('/user/logins', methods=['GET'])
+async def get_user_logins():
+    """
+    Get the current user's recent logins, failed logins and logouts.
+    
+    Query parameters: limit (1-100, default 20). Events reach the table
+    in batches, so the newest may appear up to [LOGIN_AUDIT]
+    flush_interval_ms late.
+    """
+    if 'user_id' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Not authenticated'
+        }), 401
+    
+    limit = min(max(request.args.get('limit', DEFAULT_LOGIN_EVENTS, type=int), 1),
+                MAX_LOGIN_EVENTS)
+    try:
+        user_id = session['user_id']
+        events = await get_recent_logins_async(user_id, limit)
+        return jsonify({
+            'success': True,
+            'last_login_at': await get_last_login_async(user_id),
+            'events': [{'event': row['event'], 'ip': row['ip'], 'created_at': row['created_at']}
+                       for row in events]
+        })
+    except Exception as e:
+        logger.error("API error in get_user_logins: %s", e)
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error'
+        }), 500
+
+@api_bp.route('/users', methods=['GET'])
+async def get_users():
+    """
+    List users ordered by ID, one page at a time.
+    
+    Query parameters: limit (1-500, default 50), after (next_cursor of the
+    previous page) and fields (comma-separated subset of id, username and
+    created_at).
+    """
+    if 'user_id' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Not authenticated'
+        }), 401
+    
+    fields = _requested_fields()
+    if fields is None:
+        return jsonify({
+            'success': False,
+            'message': f"fields must be a subset of: {', '.join(USER_FIELDS)}"
+        }), 400
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after_id = max(request.args.get('after', 0, type=int), 0)
+    
+    try:
+        # One extra row tells whether another page follows
+        rows = await list_users_async(after_id, limit + 1, fields)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'success': True,
+            'users': [{name: row[name] for name in fields} for row in rows],
+            'next_cursor': rows[-1]['id'] if has_more else None
+        })
+    except Exception as e:
+        logger.error("API error in get_users: %s", e)
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error'
+        }), 500
+
+@api_bp.route('/users/search', methods=['GET'])
+async def search_users():
+    """
+    Autocomplete usernames.
+    
+    Query parameters: q (search text), mode (prefix or fuzzy, default
+    prefix) and limit (1-50, default 10).
+    """
+    if 'user_id' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Not authenticated'
+        }), 401
+    
+    text = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'prefix').lower()
+    if not text or mode not in SEARCH_MODES:
+        return jsonify({
+            'success': False,
+            'message': f"q is required and mode must be one of: {', '.join(SEARCH_MODES)}"
+        }), 400
+    limit = min(max(request.args.get('limit', DEFAULT_SEARCH_RESULTS, type=int), 1),
+                MAX_SEARCH_RESULTS)
+    
+    try:
+        rows = await search_users_async(text, mode, limit)
+        return jsonify({
+            'success': True,
+            'users': [{'id': row['id'], 'username': row['username']} for row in rows]
+        })
+    except Exception as e:
+        logger.error("API error in search_users: %s", e)
         return jsonify({
             'success': False,
             'message': 'Internal server error'
         }), 500
 
+@api_bp.route('/users/export', methods=['GET'])
+def export_users():
+    """
+    Stream every user as NDJSON (default) or CSV.
+    
+    Query parameters: format (ndjson or csv) and fields (comma-separated
+    subset of id, username, created_at). Rows are read from a database
+    cursor while the response is sent, so memory use does not depend on
+    the number of users.
+    """
+    if 'user_id' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Not authenticated'
+        }), 401
+    
+    fields = _requested_fields()
+    export_format = request.args.get('format', 'ndjson').lower()
+    if fields is None or export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': (f"format must be one of: {', '.join(EXPORT_FORMATS)}; "
+                        f"fields a subset of: {', '.join(USER_FIELDS)}")
+        }), 400
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    body = _export_chunks(iter_users(fields), fields, export_format)
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=users.{extension}',
+        'Cache-Control': 'no-store'
+    })
+
 @api_bp.route('/status', methods=['GET'])
 def get_status():
     """Get application status."""
@@ -37,10 +260,23 @@ def get_status():
         return jsonify({
             'success': True,
             'status': 'running',
-            'authenticated': 'user_id' in session
+            'authenticated': 'user_id' in session,
+            'metrics': get_request_summary()
         })
     except Exception as e:
-        logger.error(f"API error in get_status: {str(e)}")
+        logger.error("API error in get_status: %s", e)
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error'
+        }), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get application metrics in Prometheus text format."""
+    try:
+        return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        logger.error("API error in get_metrics: %s", e)
         return jsonify({
             'success': False,
             'message': 'Internal server error'
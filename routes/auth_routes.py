@@ -1,76 +1,102 @@
 """Authentication routes for login, registration, and logout."""
 from flask import Blueprint, render_template, redirect, url_for, flash, session, request
-from forms.auth_forms import RegistrationForm, LoginForm
-from models.user import create_user, verify_user
+from models.user import create_user_async, verify_user_async
+from models.login_events import record_login_event
+from utils.hashing import HashingBusyError
+from utils.rate_limit import check_attempt, record_failure
+from utils.session_store import regenerate_session
+from utils.templating import get_breadcrumb
 import logging
 
 logger = logging.getLogger('flask_app')
 
 auth_bp = Blueprint('auth', __name__)
 
+def _too_many_attempts(template, endpoint, form, retry_after):
+    """Re-render an auth form with a 429 status and Retry-After header."""
+    flash(f'Too many attempts. Please try again in {retry_after} seconds.', 'error')
+    return (render_template(template, form=form, breadcrumb=get_breadcrumb(endpoint)),
+            429, {'Retry-After': str(retry_after)})
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
-def register():
+async def register():
     """User registration route."""
     # Redirect if already logged in
     if 'user_id' in session:
         return redirect(url_for('main.index'))
     
+    from forms.auth_forms import RegistrationForm  # deferred: WTForms loads on first use
     form = RegistrationForm()
     
     if form.validate_on_submit():
+        # Throttled before create_user hashes the password
+        retry_after = check_attempt(request.remote_addr)
+        if retry_after:
+            return _too_many_attempts('auth/register.html', 'auth.register', form, retry_after)
         try:
-            user_id = create_user(form.username.data, form.password.data)
+            user_id = await create_user_async(form.username.data, form.password.data)
             if user_id:
                 flash('Registration successful! Please log in.', 'success')
-                logger.info(f"New user registered: {form.username.data}")
+                logger.info("New user registered: %s", form.username.data)
                 return redirect(url_for('auth.login'))
             else:
                 flash('Registration failed. Please try again.', 'error')
-                logger.error(f"Registration failed for: {form.username.data}")
+                logger.error("Registration failed for: %s", form.username.data)
+        except HashingBusyError:
+            raise
         except Exception as e:
             flash('An error occurred during registration.', 'error')
-            logger.error(f"Registration error: {str(e)}")
+            logger.error("Registration error: %s", e)
     
-    return render_template('auth/register.html', form=form, breadcrumb=[
-        {'text': 'Home', 'url': url_for('main.index')},
-        {'text': 'Register', 'url': None}
-    ])
+    return render_template('auth/register.html', form=form,
+                           breadcrumb=get_breadcrumb('auth.register'))
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
-def login():
+async def login():
     """User login route."""
     # Redirect if already logged in
     if 'user_id' in session:
         return redirect(url_for('main.index'))
     
+    from forms.auth_forms import LoginForm  # deferred: WTForms loads on first use
     form = LoginForm()
     
     if form.validate_on_submit():
-        user = verify_user(form.username.data, form.password.data)
+        # Throttled before verify_user hashes the password
+        retry_after = check_attempt(request.remote_addr, form.username.data)
+        if retry_after:
+            return _too_many_attempts('auth/login.html', 'auth.login', form, retry_after)
+        
+        user = await verify_user_async(form.username.data, form.password.data)
         if user:
+            regenerate_session(session)
             session['user_id'] = user['id']
             session['username'] = user['username']
             session.permanent = form.remember.data
+            record_login_event('login', user['username'], user['id'], request.remote_addr)
             flash('Login successful!', 'success')
-            logger.info(f"User logged in: {user['username']}")
+            logger.info("User logged in: %s", user['username'])
             
             # Redirect to next page or home
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('main.index'))
         else:
+            record_failure(form.username.data)
+            record_login_event('failure', form.username.data, ip=request.remote_addr)
             flash('Invalid username or password.', 'error')
-            logger.warning(f"Failed login attempt for: {form.username.data}")
+            logger.warning("Failed login attempt for: %s", form.username.data)
     
-    return render_template('auth/login.html', form=form, breadcrumb=[
-        {'text': 'Home', 'url': url_for('main.index')},
-        {'text': 'Login', 'url': None}
-    ])
+    return render_template('auth/login.html', form=form,
+                           breadcrumb=get_breadcrumb('auth.login'))
 
 @auth_bp.route('/logout')
 def logout():
     """User logout route."""
     username = session.get('username', 'Unknown')
+    if 'user_id' in session:
+        record_login_event('logout', username, session['user_id'], request.remote_addr)
     session.clear()
+    regenerate_session(session)
     flash('You have been logged out.', 'info')
-    logger.info(f"User logged out: {username}")
+    logger.info("User logged out: %s", username)
     return redirect(url_for('auth.login'))
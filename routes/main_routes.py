@@ -1,6 +1,7 @@
 """Main application routes."""
 from flask import Blueprint, render_template, redirect, url_for, session, request
 from functools import wraps
+from utils.templating import get_breadcrumb
 import logging
 
 logger = logging.getLogger('flask_app')
@@ -23,15 +24,9 @@ def index():
     username = session.get('username', 'User')
     return render_template('index.html', 
                          username=username,
-                         breadcrumb=[
-                             {'text': 'Home', 'url': None}
-                         ])
+                         breadcrumb=get_breadcrumb('main.index'))
 
 @main_bp.route('/about')
 def about():
     """About page route."""
-    return render_template('about.html',
-                         breadcrumb=[
-                             {'text': 'Home', 'url': url_for('main.index')},
-                             {'text': 'About', 'url': None}
-                         ])
+    return render_template('about.html', breadcrumb=get_breadcrumb('main.about'))
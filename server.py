@@ -0,0 +1,289 @@
+"""
+Production server: preforked WSGI workers sharing one listening socket.
+
+The app is created once in the master process and inherited copy-on-write
+by every worker. Signals sent to the master:
+
+    SIGHUP           reload config.ini, start new workers, then retire the old
+    SIGTERM, SIGINT  stop accepting, let in-flight requests finish, exit
+
+Usage: python server.py (POSIX only; on Windows use run.bat / app.py).
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+from app import create_app
+from utils.config_parser import get_settings, reload_config
+from utils.logger import shutdown_logger, use_worker_log_file
+from utils.database import shutdown_db
+from utils.async_database import shutdown_db_executor
+from utils.hashing import shutdown_hashing
+from models.login_events import shutdown_login_audit
+
+logger = logging.getLogger('flask_app')
+
+# A worker that dies sooner than this after starting is respawned with a delay
+_MIN_WORKER_LIFETIME = 1.0
+
+def _worker_count(settings):
+    """Configured worker count; 0 means one per CPU."""
+    return settings.APP.workers or os.cpu_count() or 1
+
+def create_listener(host, port, backlog):
+    """
+    Bind the listening socket shared by all workers.
+    
+    Args:
+        host: Interface to bind
+        port: TCP port
+        backlog: Listen queue length
+    
+    Returns:
+        Listening socket, inheritable by forked workers
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    # Every worker select()s on this socket and all of them wake for each
+    # connection; the ones that lose the accept() race must get EAGAIN and
+    # go back to select() rather than block where shutdown() never reaches
+    sock.setblocking(False)
+    return sock
+
+def _count_requests(wsgi_app, max_requests, stopping):
+    """
+    Wrap a WSGI app to track in-flight requests and the recycling limit.
+    
+    Args:
+        wsgi_app: WSGI application
+        max_requests: Requests after which the worker stops (0 = never)
+        stopping: Event set once the limit is reached
+    
+    Returns:
+        Tuple of (wrapped app, function returning the in-flight count)
+    """
+    lock = threading.Lock()
+    state = {'active': 0, 'served': 0}
+    
+    def finished():
+        with lock:
+            state['active'] -= 1
+            state['served'] += 1
+            limit_reached = max_requests and state['served'] >= max_requests
+        if limit_reached:
+            stopping.set()
+    
+    def counted_app(environ, start_response):
+        with lock:
+            state['active'] += 1
+        try:
+            result = wsgi_app(environ, start_response)
+        except BaseException:
+            finished()
+            raise
+        return ClosingIterator(result, finished)
+    
+    def active():
+        with lock:
+            return state['active']
+    
+    return counted_app, active
+
+def run_worker(app, sock, slot):
+    """
+    Serve requests on the shared socket until told to stop.
+    
+    Runs in a forked worker. SIGTERM/SIGINT or reaching max_requests stop
+    accepting new connections; in-flight requests get graceful_timeout
+    seconds to finish before the worker flushes its queues and exits.
+    
+    Args:
+        app: Flask application (preloaded in the master)
+        sock: Listening socket
+        slot: Worker slot, naming the worker's log file
+    """
+    settings = get_settings()
+    max_requests = settings.APP.max_requests
+    if max_requests:
+        # Jitter keeps workers started together from recycling together
+        max_requests += random.randint(0, settings.APP.max_requests_jitter)
+    
+    # Rotating one file from several processes would lose records
+    use_worker_log_file(slot)
+    
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    
+    wsgi_app, active = _count_requests(app, max_requests, stopping)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, wsgi_app, threaded=True, fd=sock.fileno())
+    
+    def stop_when_asked():
+        stopping.wait()
+        server.shutdown()
+    
+    threading.Thread(target=stop_when_asked, name='worker-stop', daemon=True).start()
+    logger.info("Worker %d serving on %s:%d (max_requests=%d)",
+                os.getpid(), host, port, max_requests)
+    server.serve_forever()
+    
+    deadline = time.monotonic() + settings.APP.graceful_timeout
+    while active() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server.server_close()
+    logger.info("Worker %d exiting", os.getpid())
+
+def _signal_worker(pid, signum):
+    """Send a signal to a worker that may already have exited."""
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+def _spawn_worker(app, sock, slot):
+    """
+    Fork a worker process.
+    
+    Args:
+        app: Flask application
+        sock: Listening socket
+        slot: Worker slot, not used by any other live worker
+    
+    Returns:
+        Child PID (in the master)
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+    
+    # Child: never return into the master's loop
+    exit_code = 0
+    try:
+        run_worker(app, sock, slot)
+    except BaseException:
+        logger.exception("Worker %d crashed", os.getpid())
+        exit_code = 1
+    finally:
+        # os._exit() skips atexit hooks; write buffered login events first
+        shutdown_login_audit()
+        shutdown_db()
+        shutdown_db_executor()
+        shutdown_hashing()
+        shutdown_logger()
+        os._exit(exit_code)
+
+def serve(app=None):
+    """
+    Run the preforking master process.
+    
+    Args:
+        app: Flask application (created here if not given)
+    """
+    if not hasattr(os, 'fork'):
+        sys.exit("server.py needs os.fork(); use 'python app.py' on this platform")
+    
+    app = app or create_app()
+    settings = get_settings()
+    
+    # The JSON access log already records every request
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    sock = create_listener(settings.APP.host, settings.APP.port, settings.APP.backlog)
+    
+    # Workers open their own connections and threads; flush and release the
+    # master's so nothing is shared across fork()
+    shutdown_login_audit()
+    shutdown_db()
+    shutdown_db_executor()
+    shutdown_hashing()
+    
+    pending_signals = []
+    for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: pending_signals.append(signum))
+    
+    workers = {}
+    retiring = set()
+    # Live worker PID -> slot. A replacement takes the lowest free slot, so
+    # only up to twice the worker count (during a rolling restart) are used
+    slots = {}
+    
+    def spawn():
+        used = set(slots.values())
+        slot = next(slot for slot in range(len(used) + 1) if slot not in used)
+        pid = _spawn_worker(app, sock, slot)
+        workers[pid] = time.monotonic()
+        slots[pid] = slot
+    
+    for _ in range(_worker_count(settings)):
+        spawn()
+    logger.info("Master %d started %d workers on %s:%d", os.getpid(), len(workers),
+                settings.APP.host, settings.APP.port)
+    
+    stopping = False
+    stop_deadline = None
+    while workers:
+        while pending_signals:
+            signum = pending_signals.pop(0)
+            if signum == signal.SIGHUP and not stopping:
+                # Rolling restart: start the replacements before retiring
+                # the old workers so capacity never drops
+                reload_config()
+                settings = get_settings()
+                old_workers = [pid for pid in workers if pid not in retiring]
+                for _ in range(_worker_count(settings)):
+                    spawn()
+                for pid in old_workers:
+                    retiring.add(pid)
+                    _signal_worker(pid, signal.SIGTERM)
+                logger.info("Rolling restart: replaced %d workers", len(old_workers))
+            elif signum in (signal.SIGTERM, signal.SIGINT) and not stopping:
+                stopping = True
+                stop_deadline = time.monotonic() + settings.APP.graceful_timeout + 5
+                for pid in workers:
+                    _signal_worker(pid, signal.SIGTERM)
+                logger.info("Shutting down %d workers", len(workers))
+        
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if stopping and time.monotonic() > stop_deadline:
+                for pid in workers:
+                    _signal_worker(pid, signal.SIGKILL)
+                stop_deadline = float('inf')
+            time.sleep(0.1)
+            continue
+        
+        started = workers.pop(pid, None)
+        if started is None:
+            continue
+        slots.pop(pid, None)
+        if pid in retiring or stopping:
+            retiring.discard(pid)
+            continue
+        
+        # Recycled (max_requests) or crashed: replace the worker
+        if os.waitstatus_to_exitcode(status) != 0:
+            logger.warning("Worker %d exited with status %d", pid,
+                           os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started < _MIN_WORKER_LIFETIME:
+            time.sleep(_MIN_WORKER_LIFETIME)
+        spawn()
+    
+    sock.close()
+    logger.info("Master %d stopped", os.getpid())
+
+if __name__ == '__main__':
+    serve()
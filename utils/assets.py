@@ -0,0 +1,342 @@
+"""Static asset pipeline: bundling, minification, fingerprinting and precompression."""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import click
+from flask import current_app, request, send_from_directory, url_for
+from utils.config_parser import get_config_bool
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('flask_app')
+
+# Bundles built into static/dist, as output name -> source files in order
+BUNDLES = {
+    'css/app.css': ('css/custom.css',),
+    'js/app.js': ('js/theme.js', 'js/toast.js'),
+}
+
+# Third-party files that can be vendored into static/vendor instead of the CDN
+VENDOR_FILES = {
+    'bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
+    'bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
+    'bootstrap-icons.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/bootstrap-icons.css',
+    'fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/fonts/bootstrap-icons.woff2',
+    'fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.1/font/fonts/bootstrap-icons.woff',
+}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Fingerprinted files never change, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 31536000
+
+# Precompressed variants in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Logical static path -> fingerprinted path, consumed by url_for('static', ...)
+_manifest = {}
+
+# Whether vendor_url() points at static/vendor rather than the CDN
+_use_vendor = False
+
+def minify_css(text):
+    """
+    Minify a stylesheet by removing comments and redundant whitespace.
+    
+    Args:
+        text: CSS source
+    
+    Returns:
+        Minified CSS
+    """
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+def minify_js(text):
+    """
+    Minify a script conservatively, line by line.
+    
+    Removes comment-only lines, block comments at the start of a line (code
+    after the closing */ is kept), indentation and blank lines. Lines
+    inside template literals are kept verbatim, and code is never
+    rewritten, so the output behaves exactly like the source.
+    
+    Args:
+        text: JavaScript source
+    
+    Returns:
+        Minified JavaScript
+    """
+    lines = []
+    in_comment = False
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            code = line
+        else:
+            code = line.strip()
+            if in_comment:
+                end = code.find('*/')
+                if end < 0:
+                    continue
+                in_comment = False
+                code = code[end + 2:].lstrip()
+            while code.startswith('/*'):
+                end = code.find('*/', 2)
+                if end < 0:
+                    in_comment = True
+                    code = ''
+                    break
+                code = code[end + 2:].lstrip()
+            if not code or code.startswith('//'):
+                continue
+        lines.append(code)
+        if code.count('`') % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+def _fingerprint(name, content):
+    """Return name with a content hash inserted before the extension."""
+    root, ext = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+def _write_atomic(path, content):
+    """Write a file so readers never see a partial version."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def _emit(static_folder, name, content):
+    """
+    Write a fingerprinted file and its precompressed variants into dist.
+    
+    Files are content-addressed, so unchanged outputs are not rewritten.
+    
+    Args:
+        static_folder: Application static folder
+        name: Logical path relative to the static folder
+        content: File content (bytes)
+    
+    Returns:
+        Fingerprinted path relative to the static folder
+    """
+    hashed = f'{DIST_DIR}/{_fingerprint(name, content)}'
+    path = os.path.join(static_folder, hashed)
+    if not os.path.exists(path):
+        _write_atomic(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(path + '.br', brotli.compress(content))
+        _write_atomic(path, content)
+    return hashed
+
+def build_assets(static_folder, vendor=False):
+    """
+    Bundle, minify and fingerprint the static assets.
+    
+    Writes static/dist/<name>.<hash>.<ext> with .gz (and .br when the
+    brotli package is installed) variants plus a manifest mapping logical
+    names to fingerprinted paths, and removes outputs of earlier builds.
+    
+    Args:
+        static_folder: Application static folder
+        vendor: Also fingerprint vendored files found in static/vendor
+    
+    Returns:
+        Manifest dictionary
+    """
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        minify = minify_css if name.endswith('.css') else minify_js
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                parts.append(minify(f.read()))
+        manifest[name] = _emit(static_folder, name, '\n'.join(parts).encode('utf-8'))
+    
+    if vendor:
+        for name in VENDOR_FILES:
+            source = os.path.join(static_folder, 'vendor', name)
+            if not os.path.isfile(source):
+                continue
+            with open(source, 'rb') as f:
+                content = f.read()
+            vendor_name = f'vendor/{name}'
+            if name.startswith('fonts/'):
+                # Referenced by relative URLs from the icon stylesheet, which
+                # already version them with a query string
+                path = os.path.join(static_folder, DIST_DIR, vendor_name)
+                _write_atomic(path, content)
+                manifest[vendor_name] = f'{DIST_DIR}/{vendor_name}'
+            else:
+                manifest[vendor_name] = _emit(static_folder, vendor_name, content)
+    
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    _write_atomic(os.path.join(dist_folder, MANIFEST_NAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    
+    # Remove outputs of earlier builds
+    keep = {MANIFEST_NAME}
+    for hashed in manifest.values():
+        relative = hashed[len(DIST_DIR) + 1:]
+        keep.update((relative, relative + '.gz', relative + '.br'))
+    for directory, _, files in os.walk(dist_folder):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            relative = os.path.relpath(path, dist_folder).replace(os.sep, '/')
+            if relative not in keep and not file_name.endswith('.tmp'):
+                os.remove(path)
+    
+    return manifest
+
+def load_manifest(static_folder):
+    """
+    Load the manifest written by build_assets().
+    
+    Args:
+        static_folder: Application static folder
+    
+    Returns:
+        Manifest dictionary, or None if no build exists
+    """
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def vendor_files_present(static_folder):
+    """Check whether every vendored file has been downloaded."""
+    return all(os.path.isfile(os.path.join(static_folder, 'vendor', name))
+               for name in VENDOR_FILES)
+
+def vendor_assets(static_folder):
+    """
+    Download the third-party files into static/vendor.
+    
+    Args:
+        static_folder: Application static folder
+    """
+    import urllib.request  # only needed by this one-off download command
+    for name, url in VENDOR_FILES.items():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            content = response.read()
+        _write_atomic(os.path.join(static_folder, 'vendor', name), content)
+        logger.info("Vendored %s (%d bytes)", name, len(content))
+
+def vendor_url(name):
+    """
+    Get the URL of a third-party asset.
+    
+    Args:
+        name: Key of VENDOR_FILES, e.g. 'bootstrap.min.css'
+    
+    Returns:
+        Local fingerprinted URL when vendoring is enabled, else the CDN URL
+    """
+    if _use_vendor:
+        return url_for('static', filename=f'vendor/{name}')
+    return VENDOR_FILES[name]
+
+def _rewrite_static_url(endpoint, values):
+    """Point url_for('static', filename=...) at the fingerprinted file."""
+    if endpoint == 'static':
+        hashed = _manifest.get(values.get('filename'))
+        if hashed is not None:
+            values['filename'] = hashed
+
+def _serve_static(filename):
+    """
+    Serve static files, negotiating precompressed variants of built assets.
+    
+    Fingerprinted files get immutable far-future caching; everything else
+    is served by Flask's default static handler.
+    
+    Args:
+        filename: Path relative to the static folder
+    """
+    if not filename.startswith(DIST_DIR + '/'):
+        return current_app.send_static_file(filename)
+    
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, suffix in ENCODINGS:
+        if (request.accept_encodings[encoding]
+                and os.path.isfile(os.path.join(static_folder, filename + suffix))):
+            response = send_from_directory(static_folder, filename + suffix,
+                                           mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_folder, filename, mimetype=mimetype,
+                                       max_age=IMMUTABLE_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+def init_assets(app):
+    """
+    Build the asset bundles and serve them fingerprinted.
+    
+    Reads [ASSETS] from config.ini: build_on_startup rebuilds the bundles
+    when the app is created (otherwise the manifest from 'flask
+    build-assets' is used) and vendor serves Bootstrap from static/vendor
+    (filled by 'flask vendor-assets') instead of the CDN.
+    
+    Args:
+        app: Flask application
+    """
+    global _manifest, _use_vendor
+    
+    static_folder = app.static_folder
+    vendor = get_config_bool('ASSETS', 'vendor', False)
+    if vendor and not vendor_files_present(static_folder):
+        logger.warning("Vendored assets missing, using the CDN (run 'flask vendor-assets')")
+        vendor = False
+    
+    manifest = None
+    if not get_config_bool('ASSETS', 'build_on_startup', True):
+        manifest = load_manifest(static_folder)
+    if manifest is None:
+        manifest = build_assets(static_folder, vendor)
+    _manifest = manifest
+    _use_vendor = vendor
+    
+    app.url_defaults(_rewrite_static_url)
+    app.view_functions['static'] = _serve_static
+    app.jinja_env.globals['vendor_url'] = vendor_url
+    
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Bundle, minify, fingerprint and precompress static assets."""
+        use_vendor = (get_config_bool('ASSETS', 'vendor', False)
+                      and vendor_files_present(app.static_folder))
+        result = build_assets(app.static_folder, use_vendor)
+        for name, hashed in sorted(result.items()):
+            click.echo(f'{name} -> {hashed}')
+    
+    @app.cli.command('vendor-assets')
+    def vendor_assets_command():
+        """Download Bootstrap and Bootstrap Icons into static/vendor."""
+        vendor_assets(app.static_folder)
+        click.echo("Vendored assets downloaded; set [ASSETS] vendor = true to use them")
+    
+    logger.info("Static assets built: %d files (brotli %s)", len(manifest),
+                'enabled' if brotli is not None else 'unavailable')
@@ -0,0 +1,103 @@
+"""Asyncio wrappers that run blocking database work on a dedicated thread pool."""
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.config_parser import get_config_int
+from utils.database import execute_query, execute_many
+
+# Thread pool reserved for database and model calls made from async code
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_db_executor():
+    """
+    Get the thread pool used for async database calls.
+    
+    The pool is created on first use and sized by [DATABASE] async_workers.
+    
+    Returns:
+        ThreadPoolExecutor instance
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, get_config_int('DATABASE', 'async_workers', 8))
+                _executor = ThreadPoolExecutor(max_workers=workers,
+                                               thread_name_prefix='db-async')
+    return _executor
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """
+    Run a blocking function on the database thread pool and await it.
+    
+    The caller's context variables are copied into the worker thread so
+    code that relies on request-scoped state keeps working.
+    
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+    
+    Returns:
+        The return value of func
+    """
+    import asyncio  # deferred: only async views need it, keeps worker startup fast
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_db_executor(), call)
+
+async def execute_query_async(query, params=None, fetch_one=False, fetch_all=False, commit=False):
+    """
+    Async variant of execute_query().
+    
+    Args:
+        query: SQL query string
+        params: Query parameters (tuple or dict)
+        fetch_one: Return single row
+        fetch_all: Return all rows
+        commit: Commit the transaction
+    
+    Returns:
+        Query results or None
+    """
+    return await run_in_db_executor(execute_query, query, params,
+                                    fetch_one=fetch_one, fetch_all=fetch_all, commit=commit)
+
+async def execute_many_async(query, seq_of_params):
+    """
+    Async variant of execute_many().
+    
+    Args:
+        query: SQL statement
+        seq_of_params: Iterable of parameter tuples or dicts
+    
+    Returns:
+        Number of rows affected
+    """
+    return await run_in_db_executor(execute_many, query, seq_of_params)
+
+def shutdown_db_executor(wait=True):
+    """
+    Shut down the async database thread pool.
+    
+    Args:
+        wait: Block until queued calls have finished
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def _reset_after_fork():
+    """Drop the executor inherited from the parent; its threads do not exist here."""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,95 @@
+"""In-process LRU cache with per-entry TTL."""
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by TTLCache.get() when a key is absent or expired
+MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a TTL.
+    
+    Memory is bounded by max_entries; the least recently used entry is
+    evicted when the cache is full. A max_entries of 0 disables caching.
+    """
+    
+    def __init__(self, max_entries, ttl):
+        """
+        Args:
+            max_entries: Maximum number of entries kept
+            ttl: Default time to live in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+    
+    def get(self, key):
+        """
+        Look up a key, refreshing its LRU position.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            The cached value, or MISSING
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entry if full.
+        
+        Args:
+            key: Cache key
+            value: Value to store (None is a valid value)
+            ttl: Optional TTL override in seconds
+        """
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def delete(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self):
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with hits, misses, evictions, expirations and size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -1,13 +1,265 @@
-"""Configuration parser module for reading config.ini settings."""
+"""
+Configuration module: a typed, validated and immutable snapshot of config.ini.
+
+config.ini is parsed once into an immutable Settings object with one attribute
+per section (get_settings().DATABASE.pool_size). Environment variables named
+APP_CONFIG__<SECTION>__<KEY> override file values, and the snapshot can be
+reloaded from disk and swapped atomically while the app is running. The
+get_config* helpers remain as O(1) lookups into the current snapshot.
+"""
+import collections
 import configparser
+import logging
 import os
+import threading
+import types
+
+logger = logging.getLogger('flask_app')
+
+# Get the path to config.ini (APP_CONFIG_FILE points at another file)
+config_path = os.environ.get(
+    'APP_CONFIG_FILE',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini'))
+
+# Environment variables with this prefix override config.ini values
+ENV_PREFIX = 'APP_CONFIG__'
+
+_BOOLEAN_STATES = configparser.ConfigParser.BOOLEAN_STATES
+
+class ConfigError(ValueError):
+    """Raised when config.ini or an override holds an invalid value."""
+
+def _setting(type_, default, choices=None, minimum=None):
+    """Describe one typed setting for SCHEMA."""
+    return (type_, default, choices, minimum)
+
+# Every typed setting: section -> key -> (type, default, choices, minimum).
+# Keys outside the schema (e.g. [RESPONSE_CACHE] route policies) stay strings.
+SCHEMA = {
+    'APP': {
+        'app_name': _setting(str, 'Flask App'),
+        'secret_key': _setting(str, 'dev-secret-key-change-this'),
+        'debug': _setting(bool, True),
+        'host': _setting(str, '0.0.0.0'),
+        'port': _setting(int, 5000, minimum=1),
+        'config_reload_interval': _setting(int, 0, minimum=0),
+        'startup_profile': _setting(bool, False),
+        'workers': _setting(int, 0, minimum=0),
+        'max_requests': _setting(int, 0, minimum=0),
+        'max_requests_jitter': _setting(int, 0, minimum=0),
+        'graceful_timeout': _setting(int, 30, minimum=0),
+        'backlog': _setting(int, 2048, minimum=1),
+    },
+    'DATABASE': {
+        'database_path': _setting(str, 'instance/users.db'),
+        'pool_size': _setting(int, 5, minimum=1),
+        'pool_timeout': _setting(int, 5, minimum=0),
+        'pool_pre_ping': _setting(bool, True),
+        'journal_mode': _setting(str, 'WAL',
+                                 ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')),
+        'synchronous': _setting(str, 'NORMAL', ('OFF', 'NORMAL', 'FULL', 'EXTRA')),
+        'mmap_size': _setting(int, 268435456, minimum=0),
+        'cache_size': _setting(int, -16000),
+        'busy_timeout': _setting(int, 5000, minimum=0),
+        'temp_store': _setting(str, 'MEMORY', ('DEFAULT', 'FILE', 'MEMORY')),
+        'write_queue': _setting(bool, True),
+        'write_batch_size': _setting(int, 64, minimum=1),
+        'write_batch_wait_ms': _setting(int, 0, minimum=0),
+        'statement_cache_size': _setting(int, 128, minimum=0),
+        'async_workers': _setting(int, 8, minimum=1),
+    },
+    'SECURITY': {
+        'hash_method': _setting(str, 'scrypt'),
+        'salt_length': _setting(int, 16, minimum=1),
+        'hash_pool_type': _setting(str, 'thread', ('thread', 'process')),
+        'hash_workers': _setting(int, 4, minimum=1),
+        'hash_queue_size': _setting(int, 16, minimum=0),
+        'hash_timeout': _setting(int, 10, minimum=1),
+    },
+    'CACHE': {
+        'user_cache_size': _setting(int, 10000, minimum=0),
+        'user_cache_ttl': _setting(int, 300, minimum=0),
+        'user_cache_negative_ttl': _setting(int, 30, minimum=0),
+        'search_cache_size': _setting(int, 10000, minimum=0),
+        'search_cache_ttl': _setting(int, 60, minimum=0),
+    },
+    'TEMPLATES': {
+        'bytecode_cache_dir': _setting(str, 'instance/jinja_cache'),
+        'fragment_cache_size': _setting(int, 1024, minimum=0),
+        'fragment_cache_ttl': _setting(int, 3600, minimum=0),
+    },
+    'ASSETS': {
+        'build_on_startup': _setting(bool, True),
+        'vendor': _setting(bool, False),
+    },
+    'RESPONSE_CACHE': {
+        'max_entries': _setting(int, 512, minimum=0),
+        'ttl': _setting(int, 300, minimum=0),
+    },
+    'RATE_LIMIT': {
+        'enabled': _setting(bool, True),
+        'backend': _setting(str, 'memory', ('memory', 'sqlite')),
+        'window': _setting(int, 60, minimum=1),
+        'ip_limit': _setting(int, 30, minimum=0),
+        'username_limit': _setting(int, 5, minimum=0),
+        'max_entries': _setting(int, 100000, minimum=0),
+    },
+    'USER_STORE': {
+        'backend': _setting(str, 'sqlite', ('sqlite', 'memory', 'sharded')),
+        'shards': _setting(int, 4, minimum=1),
+        'shard_path': _setting(str, 'instance/users_shard{shard}.db'),
+    },
+    'LOGIN_AUDIT': {
+        'enabled': _setting(bool, True),
+        'batch_size': _setting(int, 256, minimum=1),
+        'flush_interval_ms': _setting(int, 1000, minimum=0),
+        'max_buffer': _setting(int, 10000, minimum=1),
+        'retention_days': _setting(int, 90, minimum=0),
+    },
+    'SESSION': {
+        'backend': _setting(str, 'cookie', ('cookie', 'memory', 'sqlite')),
+        'memory_max_entries': _setting(int, 10000, minimum=0),
+        'sweep_interval': _setting(int, 300, minimum=1),
+        'anonymous_lifetime': _setting(int, 3600, minimum=1),
+    },
+    'LOGGING': {
+        'log_level': _setting(str, 'INFO', ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')),
+        'log_format': _setting(str, '%(asctime)s - %(name)s - %(levelname)s - %(message)s'),
+        'log_directory': _setting(str, 'logs'),
+        'rotation': _setting(str, 'size', ('size', 'time')),
+        'max_bytes': _setting(int, 10485760, minimum=0),
+        'rotation_when': _setting(str, 'midnight'),
+        'backup_count': _setting(int, 5, minimum=0),
+        'queue_size': _setting(int, 10000, minimum=0),
+        'overflow_policy': _setting(str, 'drop', ('drop', 'block')),
+    },
+}
+
+# One immutable named tuple per section, plus the snapshot holding them all
+# (named tuples are much cheaper to create at startup than dataclasses)
+_SECTION_TYPES = {
+    section: collections.namedtuple(f'{section.title().replace("_", "")}Settings', keys)
+    for section, keys in SCHEMA.items()
+}
+
+Settings = collections.namedtuple('Settings', list(SCHEMA) + ['values', 'sections'])
+Settings.__doc__ = """
+Immutable configuration snapshot.
+
+Typed sections are attributes (settings.APP.port). values maps
+(section, key) to the typed value of every key set in config.ini or the
+environment, and sections maps a section name to its raw string values.
+"""
 
-# Get the path to config.ini
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini')
+# Programmatic overrides (section, key) -> string, applied on every load
+_overrides = {}
+
+# Current snapshot; replaced as a whole, never mutated
+_settings = None
+
+_reload_callbacks = []
+_watcher = None
+_watcher_interval = 0
+_watcher_stop = threading.Event()
+
+def _convert(section, key, raw, spec):
+    """
+    Convert a raw string to the type declared in SCHEMA and validate it.
+    
+    Raises:
+        ConfigError: If the value has the wrong type or is out of range
+    """
+    type_, _, choices, minimum = spec
+    if type_ is bool:
+        value = _BOOLEAN_STATES.get(raw.strip().lower())
+        if value is None:
+            raise ConfigError(f"[{section}] {key}: expected a boolean, got {raw!r}")
+        return value
+    if type_ is int:
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ConfigError(f"[{section}] {key}: expected an integer, got {raw!r}") from None
+        if minimum is not None and value < minimum:
+            raise ConfigError(f"[{section}] {key}: must be >= {minimum}, got {value}")
+        return value
+    if choices:
+        # Matched case-insensitively; callers compare against the spelling in SCHEMA
+        canonical = {choice.lower(): choice for choice in choices}.get(raw.strip().lower())
+        if canonical is None:
+            raise ConfigError(
+                f"[{section}] {key}: must be one of {', '.join(choices)}, got {raw!r}")
+        return canonical
+    return raw
+
+def load_settings(path=None, environ=None):
+    """
+    Parse and validate config.ini into a new snapshot.
+    
+    Values are layered as: config file, then APP_CONFIG__<SECTION>__<KEY>
+    environment variables, then overrides set with set_config_override().
+    
+    Args:
+        path: Config file path (defaults to config_path)
+        environ: Environment mapping (defaults to os.environ)
+    
+    Returns:
+        Settings snapshot
+    
+    Raises:
+        ConfigError: Listing every invalid value
+    """
+    parser = configparser.ConfigParser()
+    parser.read(path or config_path)
+    raw = {}
+    for section in parser.sections():
+        for key in parser.options(section):
+            raw[(section, key)] = parser.get(section, key)
+    
+    environ = os.environ if environ is None else environ
+    for name, value in environ.items():
+        if name.startswith(ENV_PREFIX):
+            section, sep, key = name[len(ENV_PREFIX):].partition('__')
+            if sep and section and key:
+                raw[(section.upper(), key.lower())] = value
+    raw.update(_overrides)
+    
+    values = {}
+    errors = []
+    for (section, key), value in raw.items():
+        spec = SCHEMA.get(section, {}).get(key)
+        try:
+            values[(section, key)] = value if spec is None else _convert(section, key, value, spec)
+        except ConfigError as e:
+            errors.append(str(e))
+    if errors:
+        raise ConfigError("Invalid configuration: " + '; '.join(errors))
+    
+    sections = {}
+    for (section, key), value in raw.items():
+        sections.setdefault(section, {})[key] = value
+    typed_sections = {
+        section: section_type(**{key: values.get((section, key), spec[1])
+                                 for key, spec in SCHEMA[section].items()})
+        for section, section_type in _SECTION_TYPES.items()
+    }
+    return Settings(
+        **typed_sections,
+        values=types.MappingProxyType(values),
+        sections=types.MappingProxyType(
+            {name: types.MappingProxyType(keys) for name, keys in sections.items()}))
 
-# Create config parser
-config = configparser.ConfigParser()
-config.read(config_path)
+def get_settings():
+    """
+    Get the current configuration snapshot.
+    
+    Keep a reference for the duration of a unit of work to see one
+    consistent version even if a reload happens meanwhile.
+    
+    Returns:
+        Settings snapshot
+    """
+    return _settings
 
 def get_config(section, key, fallback=None):
     """
@@ -21,10 +273,10 @@ def get_config(section, key, fallback=None):
     Returns:
         The configuration value or fallback
     """
-    try:
-        return config.get(section, key)
-    except (configparser.NoSectionError, configparser.NoOptionError):
+    keys = _settings.sections.get(section)
+    if keys is None:
         return fallback
+    return keys.get(key, fallback)
 
 def get_config_bool(section, key, fallback=False):
     """
@@ -38,10 +290,10 @@ def get_config_bool(section, key, fallback=False):
     Returns:
         The boolean configuration value or fallback
     """
-    try:
-        return config.getboolean(section, key)
-    except (configparser.NoSectionError, configparser.NoOptionError):
-        return fallback
+    value = _settings.values.get((section, key), fallback)
+    if isinstance(value, str):
+        return _convert(section, key, value, (bool, None, None, None))
+    return value
 
 def get_config_int(section, key, fallback=0):
     """
@@ -55,7 +307,150 @@ def get_config_int(section, key, fallback=0):
     Returns:
         The integer configuration value or fallback
     """
+    value = _settings.values.get((section, key), fallback)
+    if isinstance(value, str):
+        return _convert(section, key, value, (int, None, None, None))
+    return value
+
+def get_config_section(section):
+    """
+    Get every key of a section from config.ini.
+    
+    Args:
+        section: The section name in config.ini
+        
+    Returns:
+        Dictionary of key -> value, empty if the section is missing
+    """
+    return dict(_settings.sections.get(section, {}))
+
+def set_config_override(section, key, value):
+    """
+    Override a value for this process and rebuild the snapshot.
+    
+    Overrides take precedence over config.ini and the environment and
+    survive reloads. Intended for tools and benchmarks.
+    
+    Args:
+        section: The section name
+        key: The key name
+        value: New value (converted to a string)
+    
+    Raises:
+        ConfigError: If the value is invalid (the override is discarded)
+    """
+    previous = _overrides.get((section, key))
+    _overrides[(section, key)] = str(value)
     try:
-        return config.getint(section, key)
-    except (configparser.NoSectionError, configparser.NoOptionError):
-        return fallback
+        settings = load_settings()
+    except ConfigError:
+        if previous is None:
+            del _overrides[(section, key)]
+        else:
+            _overrides[(section, key)] = previous
+        raise
+    _apply(settings)
+
+def on_config_reload(callback):
+    """
+    Register a callable run with the new snapshot after every reload.
+    
+    Args:
+        callback: Callable taking the Settings snapshot
+    """
+    _reload_callbacks.append(callback)
+
+def reload_config():
+    """
+    Re-read config.ini and atomically swap in the new snapshot.
+    
+    An invalid file is rejected and the current snapshot kept.
+    
+    Returns:
+        True if the new snapshot was applied
+    """
+    try:
+        settings = load_settings()
+    except ConfigError as e:
+        logger.error("Config reload rejected: %s", e)
+        return False
+    _apply(settings)
+    return True
+
+def _apply(settings):
+    """Swap in a new snapshot and notify the reload callbacks."""
+    global _settings
+    _settings = settings
+    for callback in list(_reload_callbacks):
+        try:
+            callback(settings)
+        except Exception as e:
+            logger.error("Config reload callback failed: %s", e)
+
+def _watch_config(interval):
+    """Poll config.ini and reload it whenever the file changes."""
+    last_version = _config_version()
+    while not _watcher_stop.wait(interval):
+        version = _config_version()
+        if version != last_version:
+            last_version = version
+            if reload_config():
+                logger.info("Configuration reloaded from %s", config_path)
+
+def _config_version():
+    """
+    Identify the current version of config.ini.
+    
+    Size and inode are compared as well because file system timestamps
+    are coarse and editors often replace the file instead of writing it.
+    
+    Returns:
+        Tuple of (mtime_ns, size, inode), or None if the file is missing
+    """
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def start_config_watcher(interval):
+    """
+    Start a daemon thread that hot-reloads config.ini.
+    
+    Only values read per use pick up changes; pool, cache and worker
+    sizes are applied at startup and still need a restart.
+    
+    Args:
+        interval: Seconds between checks; 0 disables the watcher
+    """
+    global _watcher, _watcher_interval
+    if interval <= 0 or (_watcher is not None and _watcher.is_alive()):
+        return
+    _watcher_interval = interval
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch_config, args=(interval,),
+                                name='config-watcher', daemon=True)
+    _watcher.start()
+
+def stop_config_watcher():
+    """Stop the hot-reload thread if it is running."""
+    global _watcher, _watcher_interval
+    _watcher_interval = 0
+    _watcher_stop.set()
+    if _watcher is not None and _watcher is not threading.current_thread():
+        _watcher.join(timeout=5)
+    _watcher = None
+
+def _reset_after_fork():
+    """Restart the hot-reload watcher in a forked child (threads do not survive fork)."""
+    global _watcher, _watcher_stop
+    _watcher = None
+    _watcher_stop = threading.Event()
+    if _watcher_interval:
+        start_config_watcher(_watcher_interval)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# Validate and materialize the configuration once at import (startup)
+_settings = load_settings()
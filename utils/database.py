@@ -1,68 +1,646 @@
 """Database initialization and helper functions."""
 import sqlite3
+import logging
 import os
-from utils.config_parser import get_config
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from utils.config_parser import get_config, get_config_bool, get_config_int
+from utils.request_context import record_phase
+from utils.metrics import observe
+
+logger = logging.getLogger('flask_app')
+
+# Connection pools by database path (created lazily on first checkout)
+_pools = {}
+_pool_lock = threading.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'connections_created': 0,
+    'connections_discarded': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0,
+    'timeouts': 0,
+}
+_stats_lock = threading.Lock()
+
+# One writer per database path as path -> (queue, thread); each thread is
+# started on the first write to its database
+_writers = {}
+_writer_lock = threading.Lock()
+_writer_stats = {
+    'writes': 0,
+    'batches': 0,
+    'max_batch_size': 0,
+    'errors': 0,
+}
+_WRITER_STOP = object()
+
+def _create_username_search_index(conn):
+    """
+    Create the trigram full-text index over usernames.
+    
+    The external-content FTS5 table stores only the index; triggers keep it
+    in sync with every insert, update and delete on users. Skipped with a
+    warning when SQLite lacks FTS5 or the trigram tokenizer (3.34+), in
+    which case fuzzy search falls back to substring scans.
+    
+    Args:
+        conn: Connection inside the migration transaction
+    """
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+                username, content='users', content_rowid='id',
+                tokenize='trigram case_sensitive 0'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning("Username search index unavailable: %s", e)
+        return
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.id, old.username);
+            INSERT INTO users_fts (rowid, username) VALUES (new.id, new.username);
+        END
+    ''')
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+# Schema migrations as (version, name, statements), applied in order by
+# init_db(). Append new migrations; never edit one that has shipped. A
+# statement is SQL or a callable taking the connection.
+MIGRATIONS = (
+    (1, 'create users and sessions', (
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        # Server-side sessions ([SESSION] backend = sqlite)
+        '''CREATE TABLE IF NOT EXISTS sessions (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)',
+    )),
+    (2, 'index users by signup time and case-insensitive username', (
+        'CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE)',
+    )),
+    (3, 'create rate limit counters', (
+        # Sliding-window counters ([RATE_LIMIT] backend = sqlite)
+        '''CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            bucket INTEGER NOT NULL,
+            current INTEGER NOT NULL,
+            previous INTEGER NOT NULL
+        ) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_rate_limits_bucket ON rate_limits (bucket)',
+    )),
+    (4, 'create username trigram search index', (
+        _create_username_search_index,
+    )),
+    (5, 'create login events and track last login', (
+        'ALTER TABLE users ADD COLUMN last_login_at TIMESTAMP',
+        # Written in batches by models/login_events.py; user_id is NULL for
+        # failed logins to unknown usernames
+        '''CREATE TABLE IF NOT EXISTS login_events (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            username TEXT NOT NULL,
+            event TEXT NOT NULL,
+            ip TEXT,
+            created_at TIMESTAMP NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_login_events_user ON login_events (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_login_events_created_at ON login_events (created_at)',
+    )),
+)
+
+# Stored in PRAGMA user_version once every migration is applied, so startup
+# can skip the migration check with a single PRAGMA read
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Pools inherited across fork(); kept referenced so they are never closed
+_abandoned_pools = []
+
+# Accepted values for PRAGMAs that cannot be bound as query parameters
+_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+_TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
 
 def get_db_path():
     """Get the database path from config."""
     return get_config('DATABASE', 'database_path', 'instance/users.db')
 
-def init_db():
+def _choice(key, allowed, fallback):
+    """Read an enumerated PRAGMA value from config, falling back if invalid."""
+    value = get_config('DATABASE', key, fallback).upper()
+    return value if value in allowed else fallback
+
+def apply_storage_profile(conn):
     """
-    Initialize the SQLite database and create tables if they don't exist.
+    Apply the configured storage PRAGMAs to a connection.
+    
+    Reads journal_mode, synchronous, mmap_size, cache_size, busy_timeout
+    and temp_store from the [DATABASE] section of config.ini.
+    
+    Args:
+        conn: SQLite connection object
+    """
+    journal_mode = _choice('journal_mode', _JOURNAL_MODES, 'WAL')
+    synchronous = _choice('synchronous', _SYNCHRONOUS_MODES, 'NORMAL')
+    temp_store = _choice('temp_store', _TEMP_STORES, 'MEMORY')
+    mmap_size = get_config_int('DATABASE', 'mmap_size', 268435456)
+    cache_size = get_config_int('DATABASE', 'cache_size', -16000)
+    busy_timeout = get_config_int('DATABASE', 'busy_timeout', 5000)
+    
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA mmap_size = {mmap_size}")
+    conn.execute(f"PRAGMA cache_size = {cache_size}")
+    conn.execute(f"PRAGMA temp_store = {temp_store}")
+
+def init_db(db_path=None):
+    """
+    Initialize the SQLite database and apply pending schema migrations.
     Creates the instance directory if needed.
+    
+    Migrations are skipped entirely when the database's schema version
+    marker already matches SCHEMA_VERSION, which keeps worker startup to
+    one PRAGMA read.
+    
+    Args:
+        db_path: Database file (defaults to [DATABASE] database_path)
     """
-    db_path = get_db_path()
+    db_path = db_path or get_db_path()
     
     # Create instance directory if it doesn't exist
     db_dir = os.path.dirname(db_path)
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir)
     
-    # Connect to database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Connect to database; transactions are managed explicitly below
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        apply_storage_profile(conn)
+        if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+            return
+        migrate(conn)
+    finally:
+        conn.close()
+
+def migrate(conn):
+    """
+    Apply pending migrations, each in its own transaction.
     
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    Applied versions are recorded in the schema_migrations table. The write
+    lock is taken before checking each version, so processes starting
+    together apply every migration exactly once.
+    
+    Args:
+        conn: SQLite connection in autocommit mode (isolation_level=None)
+    
+    Returns:
+        List of versions applied by this call
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL NOT NULL
         )
     ''')
     
-    conn.commit()
-    conn.close()
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        start = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM schema_migrations WHERE version = ?',
+                            (version,)).fetchone():
+                conn.execute('ROLLBACK')
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            duration_ms = (time.perf_counter() - start) * 1000
+            conn.execute('INSERT INTO schema_migrations (version, name, duration_ms) VALUES (?, ?, ?)',
+                         (version, name, duration_ms))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            logger.error("Migration %d (%s) failed", version, name)
+            raise
+        applied.append(version)
+        logger.info("Applied migration %d (%s) in %.1f ms", version, name, duration_ms)
+    
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return applied
 
-def get_db_connection():
+def _statement_cache_size():
+    """Get the per-connection prepared statement cache size from config."""
+    return max(0, get_config_int('DATABASE', 'statement_cache_size', 128))
+
+def _create_connection(db_path):
     """
-    Get a database connection.
+    Open a new SQLite connection for a pool.
+    
+    Args:
+        db_path: Database file
     
     Returns:
         SQLite connection object
     """
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=False,
+                           cached_statements=_statement_cache_size())
     conn.row_factory = sqlite3.Row
+    apply_storage_profile(conn)
+    with _stats_lock:
+        _pool_stats['connections_created'] += 1
     return conn
 
-def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False):
+def _discard_connection(conn):
+    """Close a connection that is not going back into the pool."""
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+    with _stats_lock:
+        _pool_stats['connections_discarded'] += 1
+
+def _is_healthy(conn):
+    """Run a trivial query to check that a pooled connection is usable."""
+    try:
+        conn.execute('SELECT 1').fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+def _get_pool(db_path):
+    """Return the connection pool for a database, creating it on first use."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool_size = max(1, get_config_int('DATABASE', 'pool_size', 5))
+                pool = queue.LifoQueue(maxsize=pool_size)
+                # Slots are filled with None and connected on first checkout
+                for _ in range(pool_size):
+                    pool.put(None)
+                _pools[db_path] = pool
+    return pool
+
+def get_db_connection(db_path=None):
+    """
+    Check out a database connection from the pool.
+    
+    The connection must be handed back with release_db_connection().
+    Blocks for up to [DATABASE] pool_timeout seconds when every
+    connection is in use.
+    
+    Args:
+        db_path: Database file (defaults to [DATABASE] database_path)
+    
+    Returns:
+        SQLite connection object
+    """
+    db_path = db_path or get_db_path()
+    pool = _get_pool(db_path)
+    timeout = get_config_int('DATABASE', 'pool_timeout', 5)
+    
+    start = time.perf_counter()
+    try:
+        conn = pool.get(timeout=timeout)
+    except queue.Empty:
+        with _stats_lock:
+            _pool_stats['timeouts'] += 1
+        raise sqlite3.OperationalError(
+            f"Timed out after {timeout}s waiting for a database connection")
+    waited = time.perf_counter() - start
+    
+    with _stats_lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['wait_time_total'] += waited
+        if waited > _pool_stats['wait_time_max']:
+            _pool_stats['wait_time_max'] = waited
+    
+    try:
+        if conn is not None and get_config_bool('DATABASE', 'pool_pre_ping', True):
+            if not _is_healthy(conn):
+                _discard_connection(conn)
+                conn = None
+        if conn is None:
+            conn = _create_connection(db_path)
+    except sqlite3.Error:
+        # Give the slot back so a failed connect does not shrink the pool
+        pool.put(None)
+        raise
+    return conn
+
+def release_db_connection(conn, db_path=None):
+    """
+    Return a connection to the pool.
+    
+    Any open transaction is rolled back so the next borrower starts clean.
+    
+    Args:
+        conn: Connection obtained from get_db_connection()
+        db_path: Database file the connection was checked out for
+    """
+    pool = _get_pool(db_path or get_db_path())
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+    except sqlite3.Error:
+        _discard_connection(conn)
+        conn = None
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        # The pool was rebuilt by close_pool() while this connection was out
+        if conn is not None:
+            _discard_connection(conn)
+
+@contextmanager
+def pooled_connection(db_path=None):
+    """
+    Context manager that checks out a pooled connection and releases it.
+    
+    Args:
+        db_path: Database file (defaults to [DATABASE] database_path)
+    
+    Yields:
+        SQLite connection object
+    """
+    conn = get_db_connection(db_path)
+    try:
+        yield conn
+    finally:
+        release_db_connection(conn, db_path)
+
+def close_pool():
+    """
+    Close every idle pooled connection of every database.
+    
+    Called by shutdown_db(); pools are rebuilt lazily if a database is
+    used again afterwards.
+    """
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while True:
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                _discard_connection(conn)
+
+def get_pool_stats():
+    """
+    Get connection pool metrics.
+    
+    Returns:
+        Dictionary with checkout counts, wait times and pool occupancy
+        (summed over every database)
+    """
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    checkouts = stats['checkouts']
+    stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+    pools = list(_pools.values())
+    stats['pool_size'] = sum(pool.maxsize for pool in pools)
+    stats['available'] = sum(pool.qsize() for pool in pools)
+    return stats
+
+def _run_write_batch(conn, batch):
+    """
+    Execute a batch of queued writes in one transaction.
+    
+    Each write runs inside its own SAVEPOINT so a failing statement (for
+    example a UNIQUE violation) only rolls back itself. The batch shares a
+    single COMMIT, and therefore a single fsync.
+    
+    Args:
+        conn: The writer thread's connection (autocommit mode)
+        batch: List of (query, params, future, many) tuples
+    """
+    outcomes = []
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for query, params, future, many in batch:
+            try:
+                conn.execute('SAVEPOINT queued_write')
+                if many:
+                    cursor = conn.executemany(query, params)
+                    outcomes.append((future, cursor.rowcount, None))
+                else:
+                    cursor = conn.execute(query, params or ())
+                    outcomes.append((future, cursor.lastrowid, None))
+                conn.execute('RELEASE queued_write')
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK TO queued_write')
+                conn.execute('RELEASE queued_write')
+                outcomes.append((future, None, e))
+        conn.execute('COMMIT')
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        with _stats_lock:
+            _writer_stats['errors'] += len(batch)
+        for _, _, future, _ in batch:
+            future.set_exception(e)
+        return
+    
+    with _stats_lock:
+        _writer_stats['writes'] += len(batch)
+        _writer_stats['batches'] += 1
+        _writer_stats['max_batch_size'] = max(_writer_stats['max_batch_size'], len(batch))
+    for future, lastrowid, error in outcomes:
+        if error is not None:
+            with _stats_lock:
+                _writer_stats['errors'] += 1
+            future.set_exception(error)
+        else:
+            future.set_result(lastrowid)
+
+def _writer_loop(db_path, write_queue):
+    """Drain a database's write queue, grouping pending writes into one commit."""
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False,
+                           cached_statements=_statement_cache_size())
+    conn.row_factory = sqlite3.Row
+    apply_storage_profile(conn)
+    batch_size = max(1, get_config_int('DATABASE', 'write_batch_size', 64))
+    batch_wait = get_config_int('DATABASE', 'write_batch_wait_ms', 0) / 1000.0
+    
+    try:
+        while True:
+            item = write_queue.get()
+            if item is _WRITER_STOP:
+                break
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + batch_wait
+            while len(batch) < batch_size:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        item = write_queue.get(timeout=remaining)
+                    else:
+                        item = write_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _WRITER_STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                _run_write_batch(conn, batch)
+            except Exception as e:
+                # Never leave a caller blocked on a future the writer dropped
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stop:
+                break
+    finally:
+        conn.close()
+
+def _ensure_writer(db_path):
+    """
+    Start a database's writer thread if it is not already running.
+    
+    Returns:
+        The writer's queue
+    """
+    writer = _writers.get(db_path)
+    if writer is None or not writer[1].is_alive():
+        with _writer_lock:
+            writer = _writers.get(db_path)
+            if writer is None or not writer[1].is_alive():
+                # Writes queued for a dead writer are picked up by its successor
+                write_queue = writer[0] if writer is not None else queue.Queue()
+                thread = threading.Thread(target=_writer_loop, args=(db_path, write_queue),
+                                          name='db-writer', daemon=True)
+                thread.start()
+                writer = _writers[db_path] = (write_queue, thread)
+    return writer[0]
+
+def submit_write(query, params=None, many=False, db_path=None):
+    """
+    Queue a write for the database's single writer thread.
+    
+    Args:
+        query: SQL statement
+        params: Statement parameters (tuple or dict), or a sequence of
+            them when many is True
+        many: Run the statement with executemany
+        db_path: Database file (defaults to [DATABASE] database_path)
+    
+    Returns:
+        concurrent.futures.Future resolving to the statement's lastrowid,
+        or to the affected row count when many is True
+    """
+    write_queue = _ensure_writer(db_path or get_db_path())
+    future = Future()
+    write_queue.put((query, params, future, many))
+    return future
+
+def stop_writer(timeout=5):
+    """
+    Flush queued writes and stop every writer thread.
+    
+    Args:
+        timeout: Seconds to wait for each writer to finish
+    """
+    with _writer_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for write_queue, thread in writers:
+        if thread.is_alive():
+            write_queue.put(_WRITER_STOP)
+            thread.join(timeout)
+
+def get_writer_stats():
+    """
+    Get write queue metrics.
+    
+    Returns:
+        Dictionary with write, batch and error counts and queue depth
+    """
+    with _stats_lock:
+        stats = dict(_writer_stats)
+    batches = stats['batches']
+    stats['avg_batch_size'] = stats['writes'] / batches if batches else 0.0
+    stats['queue_depth'] = sum(write_queue.qsize() for write_queue, _ in list(_writers.values()))
+    return stats
+
+def shutdown_db():
+    """
+    Flush the write queue and close pooled connections.
+    
+    Registered as an exit hook by create_app().
+    """
+    stop_writer()
+    close_pool()
+
+def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=False,
+                  db_path=None):
     """
     Execute a database query with error handling.
     
+    Time spent is recorded as the 'db' phase of the current request and
+    in the db_query_duration_seconds histogram.
+    
     Args:
         query: SQL query string
         params: Query parameters (tuple or dict)
         fetch_one: Return single row
         fetch_all: Return all rows
         commit: Commit the transaction
+        db_path: Database file (defaults to [DATABASE] database_path)
         
     Returns:
         Query results or None
     """
-    conn = get_db_connection()
+    start = time.perf_counter()
+    try:
+        return _execute_query(query, params, fetch_one, fetch_all, commit,
+                              db_path or get_db_path())
+    finally:
+        elapsed = time.perf_counter() - start
+        record_phase('db', elapsed)
+        observe('db_query_duration_seconds', elapsed,
+                (('kind', 'write' if commit else 'read'),))
+
+def _execute_query(query, params, fetch_one, fetch_all, commit, db_path):
+    """Run a single query on a pooled connection or the write queue."""
+    if commit and get_config_bool('DATABASE', 'write_queue', True):
+        # Writes are serialized through the writer thread and group-committed
+        return submit_write(query, params, db_path=db_path).result()
+    
+    conn = get_db_connection(db_path)
     cursor = conn.cursor()
     
     try:
@@ -85,5 +663,99 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=F
     except sqlite3.Error as e:
         conn.rollback()
         raise e
+    finally:
+        cursor.close()
+        release_db_connection(conn, db_path)
+
+def iter_query(query, params=None, batch_size=1000, db_path=None):
+    """
+    Stream the rows of a query without materializing the result.
+    
+    Rows are fetched batch_size at a time from one cursor on a dedicated
+    connection, so memory stays constant however many rows match and a
+    long export never holds a pool slot. The connection is closed when
+    the generator is exhausted or closed.
+    
+    Args:
+        query: SQL query string
+        params: Query parameters (tuple or dict)
+        batch_size: Rows fetched per round trip
+        db_path: Database file (defaults to [DATABASE] database_path)
+    
+    Yields:
+        sqlite3.Row objects
+    """
+    conn = sqlite3.connect(db_path or get_db_path(), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        apply_storage_profile(conn)
+        cursor = conn.execute(query, params or ())
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(batch_size)
+            elapsed = time.perf_counter() - start
+            record_phase('db', elapsed)
+            observe('db_query_duration_seconds', elapsed, (('kind', 'stream'),))
+            if not rows:
+                break
+            yield from rows
     finally:
         conn.close()
+
+def execute_many(query, seq_of_params, db_path=None):
+    """
+    Execute one statement for every parameter set in a single transaction.
+    
+    Intended for bulk loads such as seeding or importing users: the whole
+    batch is prepared once, run with executemany and committed once.
+    
+    Args:
+        query: SQL statement
+        seq_of_params: Iterable of parameter tuples or dicts
+        db_path: Database file (defaults to [DATABASE] database_path)
+    
+    Returns:
+        Number of rows affected
+    """
+    start = time.perf_counter()
+    try:
+        return _execute_many(query, seq_of_params, db_path or get_db_path())
+    finally:
+        elapsed = time.perf_counter() - start
+        record_phase('db', elapsed)
+        observe('db_query_duration_seconds', elapsed, (('kind', 'batch'),))
+
+def _execute_many(query, seq_of_params, db_path):
+    """Run executemany on the write queue or a pooled connection."""
+    if get_config_bool('DATABASE', 'write_queue', True):
+        return submit_write(query, list(seq_of_params), many=True, db_path=db_path).result()
+    
+    conn = get_db_connection(db_path)
+    try:
+        cursor = conn.executemany(query, seq_of_params)
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        conn.rollback()
+        raise e
+    finally:
+        release_db_connection(conn, db_path)
+
+def _reset_after_fork():
+    """
+    Give a forked child process its own connection pools and writers.
+    
+    SQLite connections and threads must not cross fork(), so the inherited
+    pools are abandoned (closing them could release the parent's file
+    locks) and writes still queued in the parent stay with the parent.
+    """
+    global _pools, _pool_lock, _stats_lock, _writers, _writer_lock
+    _abandoned_pools.extend(_pools.values())
+    _pools = {}
+    _pool_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _writers = {}
+    _writer_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,181 @@
+"""Password hashing offloaded to a bounded worker pool."""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from utils.config_parser import get_config, get_config_int
+from utils.request_context import record_phase
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool is saturated and the call is rejected."""
+
+# Worker pool and admission slots (created lazily on first use)
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+_hash_stats = {
+    'calls': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'latency_total': 0.0,
+    'latency_max': 0.0,
+}
+_stats_lock = threading.Lock()
+
+def _get_pool():
+    """
+    Get the hashing executor and its admission semaphore.
+    
+    At most hash_workers + hash_queue_size calls are admitted at once;
+    anything beyond that is rejected instead of queueing without bound.
+    
+    Returns:
+        Tuple of (executor, semaphore)
+    """
+    global _executor, _slots
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                workers = max(1, get_config_int('SECURITY', 'hash_workers', 4))
+                queue_size = max(0, get_config_int('SECURITY', 'hash_queue_size', 16))
+                pool_type = get_config('SECURITY', 'hash_pool_type', 'thread').lower()
+                if pool_type == 'process':
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    executor = ThreadPoolExecutor(max_workers=workers,
+                                                  thread_name_prefix='hashing')
+                _slots = threading.BoundedSemaphore(workers + queue_size)
+                _executor = executor
+    return _executor, _slots
+
+def _run(func, *args, **kwargs):
+    """
+    Run a hashing function on the pool, failing fast when it is saturated.
+    
+    Args:
+        func: Hashing function to run
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+    
+    Returns:
+        The return value of func
+    
+    Raises:
+        HashingBusyError: If the queue is full or the call timed out
+    """
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        with _stats_lock:
+            _hash_stats['rejected'] += 1
+        raise HashingBusyError('Password hashing queue is full')
+    
+    start = time.perf_counter()
+    try:
+        future = executor.submit(func, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    
+    timeout = get_config_int('SECURITY', 'hash_timeout', 10)
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        with _stats_lock:
+            _hash_stats['timeouts'] += 1
+        raise HashingBusyError(f'Password hashing timed out after {timeout}s')
+    
+    elapsed = time.perf_counter() - start
+    record_phase('hash', elapsed)
+    with _stats_lock:
+        _hash_stats['calls'] += 1
+        _hash_stats['latency_total'] += elapsed
+        if elapsed > _hash_stats['latency_max']:
+            _hash_stats['latency_max'] = elapsed
+    return result
+
+def hash_password(password):
+    """
+    Hash a password using the configured method.
+    
+    Args:
+        password: Plain text password
+    
+    Returns:
+        Werkzeug password hash string
+    """
+    from werkzeug.security import generate_password_hash  # deferred until first use
+    method = get_config('SECURITY', 'hash_method', 'scrypt')
+    salt_length = get_config_int('SECURITY', 'salt_length', 16)
+    return _run(generate_password_hash, password, method=method, salt_length=salt_length)
+
+def check_password(password_hash, password):
+    """
+    Check a password against a stored hash.
+    
+    Args:
+        password_hash: Stored Werkzeug password hash
+        password: Plain text password
+    
+    Returns:
+        True if the password matches
+    """
+    from werkzeug.security import check_password_hash  # deferred until first use
+    return _run(check_password_hash, password_hash, password)
+
+def hash_passwords(passwords, method, salt_length):
+    """
+    Hash several passwords in the calling process.
+    
+    Module-level so bulk imports can send chunks of passwords to their own
+    process pool; requests use hash_password().
+    
+    Args:
+        passwords: List of plain text passwords
+        method: Werkzeug hash method
+        salt_length: Salt length
+    
+    Returns:
+        List of password hashes in input order
+    """
+    from werkzeug.security import generate_password_hash  # deferred until first use
+    return [generate_password_hash(password, method=method, salt_length=salt_length)
+            for password in passwords]
+
+def get_hashing_stats():
+    """
+    Get hashing pool metrics.
+    
+    Returns:
+        Dictionary with call, rejection and timeout counts and latencies
+    """
+    with _stats_lock:
+        stats = dict(_hash_stats)
+    calls = stats['calls']
+    stats['latency_avg'] = stats['latency_total'] / calls if calls else 0.0
+    return stats
+
+def shutdown_hashing(wait=True):
+    """
+    Shut down the hashing worker pool.
+    
+    Args:
+        wait: Block until running hashes have finished
+    """
+    global _executor, _slots
+    with _pool_lock:
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+def _reset_after_fork():
+    """Drop the pool inherited from the parent; its workers do not belong to this process."""
+    global _executor, _slots, _pool_lock, _stats_lock
+    _executor = None
+    _slots = None
+    _pool_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
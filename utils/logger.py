@@ -1,56 +1,252 @@
-"""Logging infrastructure with file and stream handlers."""
+"""Logging infrastructure with a non-blocking, queue-based pipeline."""
 import logging
+import logging.handlers
 import os
-from datetime import datetime
-from utils.config_parser import get_config
+import queue
+import threading
+from utils.config_parser import get_config, get_config_int
+from utils.request_context import RequestIdFilter
+
+# Background listener that owns the file and console handlers
+_listener = None
+_listener_lock = threading.Lock()
+
+# Handlers locked by the forking thread while fork() runs
+_fork_held = []
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a bounded queue with a configurable overflow policy.
+    
+    With the 'drop' policy records are discarded (and counted) when the
+    queue is full, so logging never blocks the request thread. With the
+    'block' policy the caller waits up to block_timeout seconds.
+    """
+    
+    def __init__(self, log_queue, overflow_policy='drop', block_timeout=1.0):
+        super().__init__(log_queue)
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        try:
+            if self.overflow_policy == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+def _create_file_handler(log_directory, safe_app_name):
+    """
+    Create the rotating file handler chosen by [LOGGING] rotation.
+    
+    Args:
+        log_directory: Directory for log files
+        safe_app_name: App name usable as a file name
+    
+    Returns:
+        Tuple of (handler, log_path)
+    """
+    log_path = os.path.join(log_directory, f"{safe_app_name}.log")
+    backup_count = get_config_int('LOGGING', 'backup_count', 5)
+    rotation = get_config('LOGGING', 'rotation', 'size').lower()
+    
+    if rotation == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_path,
+            when=get_config('LOGGING', 'rotation_when', 'midnight'),
+            backupCount=backup_count,
+            encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_path,
+            maxBytes=get_config_int('LOGGING', 'max_bytes', 10485760),
+            backupCount=backup_count,
+            encoding='utf-8')
+    return handler, log_path
+
+def _log_file_settings():
+    """Return the log directory and the app name usable as a file name."""
+    app_name = get_config('APP', 'app_name', 'FlaskApp')
+    return get_config('LOGGING', 'log_directory', 'logs'), app_name.replace(' ', '_').lower()
 
 def setup_logger():
     """
-    Set up application logger with file and stream handlers.
-    Creates a log file with format: appname_YYYYMMDD_HHMMSS.log
+    Set up application logger with a queue-based pipeline.
+    
+    Log calls only put the record on a bounded in-memory queue; a background
+    QueueListener writes it to a rotating file (appname.log) and the console.
     
     Returns:
         Configured logger instance
     """
+    global _listener
+    
     # Get configuration
-    app_name = get_config('APP', 'app_name', 'FlaskApp')
     log_level = get_config('LOGGING', 'log_level', 'INFO')
-    log_format = get_config('LOGGING', 'log_format', 
+    log_format = get_config('LOGGING', 'log_format',
                            '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    log_directory = get_config('LOGGING', 'log_directory', 'logs')
+    log_directory, safe_app_name = _log_file_settings()
+    queue_size = get_config_int('LOGGING', 'queue_size', 10000)
+    overflow_policy = get_config('LOGGING', 'overflow_policy', 'drop').lower()
+    level = getattr(logging, log_level.upper(), logging.INFO)
     
     # Create logs directory if it doesn't exist
     if not os.path.exists(log_directory):
         os.makedirs(log_directory)
     
-    # Generate log filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    safe_app_name = app_name.replace(' ', '_').lower()
-    log_filename = f"{safe_app_name}_{timestamp}.log"
-    log_path = os.path.join(log_directory, log_filename)
-    
     # Create logger
     logger = logging.getLogger('flask_app')
-    logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+    logger.setLevel(level)
     
-    # Clear any existing handlers
+    # Flush and stop any pipeline from a previous setup
+    shutdown_logger()
     logger.handlers = []
     
     # Create formatters
     formatter = logging.Formatter(log_format)
     
-    # File handler
-    file_handler = logging.FileHandler(log_path, encoding='utf-8')
-    file_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+    # File handler (rotating)
+    file_handler, log_path = _create_file_handler(log_directory, safe_app_name)
+    file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
     
     # Stream handler (console)
     stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+    stream_handler.setLevel(level)
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
     
-    logger.info(f"Logger initialized. Log file: {log_path}")
+    # Queue handler on the logger, listener thread drives the real handlers
+    log_queue = queue.Queue(maxsize=max(0, queue_size))
+    queue_handler = BoundedQueueHandler(log_queue, overflow_policy)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    
+    with _listener_lock:
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True)
+        _listener.start()
+    
+    logger.info("Logger initialized. Log file: %s", log_path)
     
     return logger
+
+def shutdown_logger():
+    """
+    Flush queued log records and stop the listener thread.
+    
+    Registered as an exit hook by create_app().
+    """
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def use_worker_log_file(slot):
+    """
+    Switch this process to its own log file, appname.worker<slot>.log.
+    
+    Called by server.py in each forked worker: processes sharing one
+    rotating file would rename it under each other during rotation and
+    lose records. Slots are reused by replacement workers, so the files
+    are rotated and pruned by backup_count like the main log.
+    
+    Args:
+        slot: Worker slot number, unique among live workers
+    
+    Returns:
+        Path of the new log file, or None if logging is not set up
+    """
+    global _listener
+    with _listener_lock:
+        listener = _listener
+        if listener is None:
+            return None
+        # Drain records queued so far to the shared file first
+        listener.stop()
+        log_directory, safe_app_name = _log_file_settings()
+        log_path = None
+        handlers = []
+        for handler in listener.handlers:
+            if isinstance(handler, logging.FileHandler):
+                file_handler, log_path = _create_file_handler(
+                    log_directory, f"{safe_app_name}.worker{slot}")
+                file_handler.setLevel(handler.level)
+                file_handler.setFormatter(handler.formatter)
+                handler.close()
+                handler = file_handler
+            handlers.append(handler)
+        _listener = logging.handlers.QueueListener(
+            listener.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return log_path
+
+def get_logging_stats():
+    """
+    Get logging pipeline metrics.
+    
+    Returns:
+        Dictionary with enqueued and dropped record counts and queue depth
+    """
+    stats = {'enqueued': 0, 'dropped': 0, 'queue_depth': 0}
+    for handler in logging.getLogger('flask_app').handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            stats['enqueued'] += handler.enqueued
+            stats['dropped'] += handler.dropped
+            stats['queue_depth'] += handler.queue.qsize()
+    return stats
+
+def _hold_handlers_for_fork():
+    """
+    Lock the listener's handlers while the process forks.
+    
+    A child forked while the listener thread is inside a write would
+    inherit that stream's lock held forever and hang on its first record.
+    """
+    listener = _listener
+    if listener is not None:
+        for handler in listener.handlers:
+            handler.acquire()
+            _fork_held.append(handler)
+
+def _release_handlers_after_fork():
+    """Unlock the handlers held by _hold_handlers_for_fork() in the parent."""
+    while _fork_held:
+        _fork_held.pop().release()
+
+def _reset_after_fork():
+    """
+    Restart the log listener in a forked child process.
+    
+    The parent's listener thread does not exist in the child, so the queue
+    handler gets a fresh queue drained by a new listener over the same file
+    and console handlers.
+    """
+    global _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    # The logging module gives every handler a new lock in the child
+    _fork_held.clear()
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    for handler in logging.getLogger('flask_app').handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            handler.queue = queue.Queue(maxsize=listener.queue.maxsize)
+            handler.enqueued = 0
+            handler.dropped = 0
+            _listener = logging.handlers.QueueListener(
+                handler.queue, *listener.handlers, respect_handler_level=True)
+            _listener.start()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(before=_hold_handlers_for_fork,
+                        after_in_parent=_release_handlers_after_fork,
+                        after_in_child=_reset_after_fork)
@@ -0,0 +1,266 @@
+"""Low-overhead request and database metrics with Prometheus text export."""
+import bisect
+import os
+import threading
+import time
+import weakref
+from flask import g, request
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Each thread writes only to its own shard, so recording takes no lock.
+# Shards are merged when metrics are collected.
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_retired = {'counters': {}, 'histograms': {}}
+
+# Callables returning {name: value} dictionaries exported as gauges
+_collectors = {}
+
+def _new_shard():
+    """Create an empty metrics shard."""
+    return {'counters': {}, 'histograms': {}}
+
+def _get_shard():
+    """Return the calling thread's shard, registering it on first use."""
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _new_shard()
+        with _shards_lock:
+            # Thread-per-request servers register a shard per request, so
+            # fold finished threads here rather than waiting for a scrape
+            _fold_dead_shards()
+            _shards.append((weakref.ref(threading.current_thread()), shard))
+    return shard
+
+def _fold_dead_shards():
+    """Merge exited threads' shards into the retired shard (holding _shards_lock)."""
+    live = []
+    for thread_ref, shard in _shards:
+        thread = thread_ref()
+        if thread is None or not thread.is_alive():
+            _merge_into(_retired, shard)
+        else:
+            live.append((thread_ref, shard))
+    _shards[:] = live
+
+def _merge_into(target, shard):
+    """Add the values of one shard into another."""
+    for key, value in list(shard['counters'].items()):
+        target['counters'][key] = target['counters'].get(key, 0) + value
+    for key, (counts, total) in list(shard['histograms'].items()):
+        merged = target['histograms'].get(key)
+        if merged is None:
+            target['histograms'][key] = [list(counts), total]
+        else:
+            for i, count in enumerate(counts):
+                merged[0][i] += count
+            merged[1] += total
+
+def inc_counter(name, labels=(), value=1):
+    """
+    Increment a counter.
+    
+    Args:
+        name: Metric name
+        labels: Tuple of (label, value) pairs
+        value: Amount to add
+    """
+    counters = _get_shard()['counters']
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+def observe(name, value, labels=()):
+    """
+    Record an observation (in seconds) in a latency histogram.
+    
+    Args:
+        name: Metric name
+        value: Observed value in seconds
+        labels: Tuple of (label, value) pairs
+    """
+    histograms = _get_shard()['histograms']
+    key = (name, labels)
+    entry = histograms.get(key)
+    if entry is None:
+        entry = histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+    entry[0][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+    entry[1] += value
+
+def register_collector(prefix, func):
+    """
+    Export the numeric values returned by func as gauges.
+    
+    Args:
+        prefix: Metric name prefix, e.g. 'db_pool'
+        func: Callable returning a dictionary of name -> number
+    """
+    _collectors[prefix] = func
+
+def collect():
+    """
+    Merge every thread's shard into one snapshot.
+    
+    Shards of threads that have exited are folded into a retired shard
+    (also whenever a new thread registers), so short-lived request
+    threads do not accumulate.
+    
+    Returns:
+        Dictionary with 'counters' and 'histograms' keyed by (name, labels)
+    """
+    snapshot = _new_shard()
+    with _shards_lock:
+        _fold_dead_shards()
+        _merge_into(snapshot, _retired)
+        for _, shard in _shards:
+            _merge_into(snapshot, shard)
+    return snapshot
+
+def quantile(counts, q):
+    """
+    Estimate a quantile from histogram bucket counts.
+    
+    Args:
+        counts: Per-bucket counts (last bucket is +Inf)
+        q: Quantile between 0 and 1
+    
+    Returns:
+        Estimated value in seconds, or 0.0 if there are no observations
+    """
+    total = sum(counts)
+    if total == 0:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+            if i >= len(LATENCY_BUCKETS):
+                return lower
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - seen) / count
+        seen += count
+    return LATENCY_BUCKETS[-1]
+
+def _format_labels(labels, extra=None):
+    """Format label pairs as a Prometheus label set."""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def render_prometheus():
+    """
+    Render all metrics in the Prometheus text exposition format.
+    
+    Returns:
+        Metrics text
+    """
+    snapshot = collect()
+    lines = []
+    
+    seen_types = set()
+    for (name, labels), value in sorted(snapshot['counters'].items()):
+        if name not in seen_types:
+            lines.append(f'# TYPE {name} counter')
+            seen_types.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    
+    for (name, labels), (counts, total) in sorted(snapshot['histograms'].items()):
+        if name not in seen_types:
+            lines.append(f'# TYPE {name} histogram')
+            seen_types.add(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    
+    for prefix, func in sorted(_collectors.items()):
+        try:
+            values = func()
+        except Exception:
+            continue
+        for key, value in sorted(values.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f'app_{prefix}_{key}'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+    
+    return '\n'.join(lines) + '\n'
+
+def get_request_summary():
+    """
+    Summarize request metrics across all endpoints.
+    
+    Returns:
+        Dictionary with request and error totals and p50/p95/p99 latency in ms
+    """
+    snapshot = collect()
+    requests_total = sum(v for (name, _), v in snapshot['counters'].items()
+                         if name == 'http_requests_total')
+    errors_total = sum(v for (name, _), v in snapshot['counters'].items()
+                       if name == 'http_request_errors_total')
+    counts = [0] * (len(LATENCY_BUCKETS) + 1)
+    for (name, _), (bucket_counts, _) in snapshot['histograms'].items():
+        if name == 'http_request_duration_seconds':
+            for i, count in enumerate(bucket_counts):
+                counts[i] += count
+    return {
+        'requests': requests_total,
+        'errors': errors_total,
+        'latency_ms': {
+            'p50': round(quantile(counts, 0.50) * 1000, 3),
+            'p95': round(quantile(counts, 0.95) * 1000, 3),
+            'p99': round(quantile(counts, 0.99) * 1000, 3),
+        },
+    }
+
+def _before_request():
+    """Start the request latency timer."""
+    g.metrics_start = time.perf_counter()
+
+def _after_request(response):
+    """Record the request count, error count and latency for the endpoint."""
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or 'none'
+    status = response.status_code
+    inc_counter('http_requests_total',
+                (('endpoint', endpoint), ('method', request.method), ('status', status)))
+    if status >= 500:
+        inc_counter('http_request_errors_total', (('endpoint', endpoint),))
+    observe('http_request_duration_seconds', elapsed, (('endpoint', endpoint),))
+    return response
+
+def init_metrics(app):
+    """
+    Register the request instrumentation hooks on the app.
+    
+    Args:
+        app: Flask application
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+def _reset_after_fork():
+    """Start a forked child with empty metrics so workers do not repeat the parent's."""
+    global _local, _shards_lock
+    _local = threading.local()
+    _shards_lock = threading.Lock()
+    _shards.clear()
+    for values in _retired.values():
+        values.clear()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,131 @@
+"""Trie-structured cache for prefix search results."""
+import threading
+import time
+
+class PrefixCache:
+    """
+    Thread-safe trie whose nodes cache the results of prefix searches.
+    
+    A node holds the results for its prefix. When a shorter prefix on the
+    path holds a complete result set (fewer rows than its limit, so every
+    match is known), longer prefixes are answered by filtering it without
+    querying. Entries expire after ttl seconds; once max_entries results
+    are cached the trie is cleared and warms up again. A max_entries of 0
+    disables caching.
+    """
+    
+    def __init__(self, max_entries, ttl):
+        """
+        Args:
+            max_entries: Maximum number of cached prefixes
+            ttl: Time to live in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._root = self._new_node()
+        self._entries = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'filtered_hits': 0, 'misses': 0, 'invalidations': 0,
+                       'resets': 0}
+    
+    @staticmethod
+    def _new_node():
+        """Return an empty node: [children by character, cached entry]."""
+        return [{}, None]
+    
+    def get(self, prefix, limit):
+        """
+        Look up the results for a prefix.
+        
+        Args:
+            prefix: Lowercased search prefix
+            limit: Number of results wanted
+        
+        Returns:
+            List of up to limit (text, item) pairs, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            node = self._root
+            for depth in range(len(prefix) + 1):
+                entry = node[1]
+                if entry is not None and entry[0] > now:
+                    _, entry_limit, results = entry
+                    complete = len(results) < entry_limit
+                    if depth == len(prefix) and (complete or entry_limit >= limit):
+                        self._stats['hits'] += 1
+                        return results[:limit]
+                    if complete:
+                        self._stats['filtered_hits'] += 1
+                        return [result for result in results
+                                if result[0].startswith(prefix)][:limit]
+                if depth == len(prefix):
+                    break
+                node = node[0].get(prefix[depth])
+                if node is None:
+                    break
+            self._stats['misses'] += 1
+            return None
+    
+    def set(self, prefix, limit, results):
+        """
+        Cache the results of a prefix search.
+        
+        Args:
+            prefix: Lowercased search prefix
+            limit: Limit the search ran with
+            results: List of (lowercased text, item) pairs in result order
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._entries >= self.max_entries:
+                self._root = self._new_node()
+                self._entries = 0
+                self._stats['resets'] += 1
+            node = self._root
+            for char in prefix:
+                node = node[0].setdefault(char, self._new_node())
+            if node[1] is None:
+                self._entries += 1
+            node[1] = (time.monotonic() + self.ttl, limit, list(results))
+    
+    def invalidate(self, text):
+        """
+        Drop every cached prefix of text, e.g. after text was added.
+        
+        Args:
+            text: Lowercased string whose prefixes may be stale
+        """
+        with self._lock:
+            self._stats['invalidations'] += 1
+            node = self._root
+            for depth in range(len(text) + 1):
+                if node[1] is not None:
+                    node[1] = None
+                    self._entries -= 1
+                if depth == len(text):
+                    break
+                node = node[0].get(text[depth])
+                if node is None:
+                    break
+    
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._root = self._new_node()
+            self._entries = 0
+    
+    def stats(self):
+        """
+        Get cache counters.
+        
+        Returns:
+            Dictionary with hits, filtered hits, misses, invalidations,
+            resets and size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self._entries
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -0,0 +1,236 @@
+"""Sliding-window rate limiting for login and registration attempts."""
+import math
+import threading
+import time
+from utils.cache import TTLCache, MISSING
+from utils.config_parser import get_settings
+from utils.database import execute_query
+import logging
+
+logger = logging.getLogger('flask_app')
+
+# Counters for /api/metrics
+_stats = {
+    'checks': 0,
+    'rejected_ip': 0,
+    'rejected_username': 0,
+    'failures_recorded': 0,
+}
+_stats_lock = threading.Lock()
+
+# Chosen by init_rate_limit(); None until then
+_backend = None
+
+# Window number of the last expired-counter sweep in this process
+_last_sweep = 0
+
+def _shift(entry, window_index):
+    """
+    Express a stored (window, current, previous) entry as counts for a window.
+    
+    Args:
+        entry: Stored tuple, or None for an unknown key
+        window_index: Number of the current window
+    
+    Returns:
+        Tuple of (count in the current window, count in the previous window)
+    """
+    if entry is None:
+        return 0, 0
+    window, current, previous = entry
+    if window == window_index:
+        return current, previous
+    if window == window_index - 1:
+        return 0, current
+    return 0, 0
+
+class MemoryRateLimitBackend:
+    """
+    Per-process counters; each worker enforces the limits on its own.
+    
+    A key costs three integers (window number and the counts of the current
+    and previous windows) in an LRU bounded by max_entries, expiring once
+    both windows have passed.
+    """
+    
+    def __init__(self, max_entries, window):
+        self._cache = TTLCache(max_entries, 2 * window)
+        self._lock = threading.Lock()
+    
+    def peek(self, key, window_index):
+        """Return (current, previous) counts for key without counting."""
+        entry = self._cache.get(key)
+        return _shift(None if entry is MISSING else entry, window_index)
+    
+    def hit(self, key, window_index):
+        """Count one event for key and return the updated (current, previous)."""
+        with self._lock:
+            current, previous = self.peek(key, window_index)
+            current += 1
+            self._cache.set(key, (window_index, current, previous))
+        return current, previous
+    
+    def sweep(self, window_index):
+        """Remove stale counters (handled by TTL expiry and LRU eviction)."""
+    
+    def size(self):
+        """Number of tracked keys."""
+        return self._cache.stats()['size']
+
+class SQLiteRateLimitBackend:
+    """
+    Counters in the application database, shared by all workers.
+    
+    The rate_limits table is created by init_db(). Increments are single
+    UPSERTs, so concurrent workers never lose a count.
+    """
+    
+    _UPSERT = '''
+        INSERT INTO rate_limits (key, bucket, current, previous) VALUES (?, ?, 1, 0)
+        ON CONFLICT (key) DO UPDATE SET
+            previous = CASE excluded.bucket - bucket
+                WHEN 0 THEN previous WHEN 1 THEN current ELSE 0 END,
+            current = CASE WHEN excluded.bucket = bucket THEN current + 1 ELSE 1 END,
+            bucket = excluded.bucket
+    '''
+    
+    def peek(self, key, window_index):
+        row = execute_query('SELECT bucket, current, previous FROM rate_limits WHERE key = ?',
+                            (key,), fetch_one=True)
+        return _shift(tuple(row) if row else None, window_index)
+    
+    def hit(self, key, window_index):
+        execute_query(self._UPSERT, (key, window_index), commit=True)
+        return self.peek(key, window_index)
+    
+    def sweep(self, window_index):
+        """Remove every counter older than the previous window in one DELETE."""
+        execute_query('DELETE FROM rate_limits WHERE bucket < ?', (window_index - 1,), commit=True)
+    
+    def size(self):
+        return execute_query('SELECT COUNT(*) FROM rate_limits', fetch_one=True)[0]
+
+def _current_window(window):
+    """
+    Locate the present moment in fixed windows of the given length.
+    
+    Returns:
+        Tuple of (window number, fraction of the window elapsed)
+    """
+    index, offset = divmod(time.time(), window)
+    return int(index), offset / window
+
+def _estimate(counts, fraction):
+    """
+    Estimate the number of events in the sliding window.
+    
+    The previous window's count is weighted by how much of it still falls
+    inside the sliding window, which approximates a true sliding log with
+    two counters per key.
+    """
+    current, previous = counts
+    return current + previous * (1 - fraction)
+
+def _retry_after(window, fraction):
+    """Seconds until the current window ends and the oldest counts start to expire."""
+    return max(1, math.ceil(window * (1 - fraction)))
+
+def _maybe_sweep(window_index):
+    """Sweep stale counters at most once per window per process."""
+    global _last_sweep
+    if window_index <= _last_sweep:
+        return
+    _last_sweep = window_index
+    try:
+        _backend.sweep(window_index)
+    except Exception as e:
+        logger.error("Rate limit sweep failed: %s", e)
+
+def check_attempt(ip, username=None):
+    """
+    Count an authentication attempt and decide whether to allow it.
+    
+    Called before any password hashing. Every attempt counts against the
+    client IP; a username is only checked here, its failures are counted
+    by record_failure().
+    
+    Args:
+        ip: Client IP address
+        username: Username being logged into, if any
+    
+    Returns:
+        None if allowed, else the number of seconds to wait
+    """
+    settings = get_settings().RATE_LIMIT
+    if _backend is None or not settings.enabled:
+        return None
+    
+    window_index, fraction = _current_window(settings.window)
+    _maybe_sweep(window_index)
+    with _stats_lock:
+        _stats['checks'] += 1
+    
+    user_limit, ip_limit = settings.username_limit, settings.ip_limit
+    if (username and user_limit and _estimate(
+            _backend.peek(f'user:{username.lower()}', window_index), fraction) >= user_limit):
+        scope = 'username'
+    elif ip_limit and _estimate(_backend.hit(f'ip:{ip}', window_index), fraction) > ip_limit:
+        scope = 'ip'
+    else:
+        return None
+    
+    with _stats_lock:
+        _stats[f'rejected_{scope}'] += 1
+    logger.warning("Rate limit exceeded (%s) for ip=%s username=%s", scope, ip, username)
+    return _retry_after(settings.window, fraction)
+
+def record_failure(username):
+    """
+    Count a failed login against a username.
+    
+    Args:
+        username: Username whose password check failed
+    """
+    settings = get_settings().RATE_LIMIT
+    if _backend is None or not settings.enabled or not settings.username_limit:
+        return
+    window_index, _ = _current_window(settings.window)
+    _backend.hit(f'user:{username.lower()}', window_index)
+    with _stats_lock:
+        _stats['failures_recorded'] += 1
+
+def get_rate_limit_stats():
+    """
+    Get rate limiter metrics for monitoring.
+    
+    Returns:
+        Dictionary with check, rejection and failure counts and tracked keys
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    if _backend is not None:
+        try:
+            stats['tracked_keys'] = _backend.size()
+        except Exception as e:
+            logger.error("Rate limit stats failed: %s", e)
+    return stats
+
+def init_rate_limit():
+    """
+    Create the rate limit backend.
+    
+    Reads [RATE_LIMIT] from config.ini: backend 'memory' keeps per-worker
+    counters, 'sqlite' shares them between workers through the database.
+    Limits and the window length are read on every check, so they follow
+    config reloads; the backend is chosen at startup.
+    """
+    global _backend
+    
+    settings = get_settings().RATE_LIMIT
+    if settings.backend == 'sqlite':
+        _backend = SQLiteRateLimitBackend()
+    else:
+        _backend = MemoryRateLimitBackend(settings.max_entries, settings.window)
+    logger.info("Rate limiting %s: %s backend, %d/IP and %d failures/username per %ds",
+                'enabled' if settings.enabled else 'disabled', settings.backend,
+                settings.ip_limit, settings.username_limit, settings.window)
@@ -0,0 +1,164 @@
+"""Request-scoped context: request IDs, phase timings and the per-request log record."""
+import contextvars
+import json
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from flask import g, request, before_render_template, template_rendered
+from utils.metrics import observe
+
+access_logger = logging.getLogger('flask_app.access')
+
+# Current request's ID and phase timings; unset outside of a request
+_request_id = contextvars.ContextVar('request_id', default=None)
+_phases = contextvars.ContextVar('request_phases', default=None)
+_counters = contextvars.ContextVar('request_counters', default=None)
+
+# Accept client-supplied request IDs only if they look like plain tokens
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+class LazyJson:
+    """Log message argument that is only serialized if the record is emitted."""
+    
+    __slots__ = ('payload',)
+    
+    def __init__(self, payload):
+        self.payload = payload
+    
+    def __str__(self):
+        return json.dumps(self.payload, separators=(',', ':'), default=str)
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to every log record as %(request_id)s."""
+    
+    def filter(self, record):
+        record.request_id = _request_id.get() or '-'
+        return True
+
+def get_request_id():
+    """
+    Get the ID of the request being handled.
+    
+    Returns:
+        Request ID string, or None outside of a request
+    """
+    return _request_id.get()
+
+def record_phase(phase, seconds):
+    """
+    Add time spent in a phase (e.g. 'db', 'hash') to the current request.
+    
+    Does nothing outside of a request, so callers need no request checks.
+    
+    Args:
+        phase: Phase name
+        seconds: Elapsed time in seconds
+    """
+    phases = _phases.get()
+    if phases is not None:
+        entry = phases.get(phase)
+        if entry is None:
+            phases[phase] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+def count_event(name, value=1):
+    """
+    Add to a named counter of the current request (e.g. lookups served
+    without a database round trip).
+    
+    Does nothing outside of a request.
+    
+    Args:
+        name: Counter name
+        value: Amount to add
+    """
+    counters = _counters.get()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + value
+
+@contextmanager
+def phase_timer(phase):
+    """
+    Context manager that records the time spent in its block.
+    
+    Args:
+        phase: Phase name
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+def _before_request():
+    """Assign a request ID and start the request timers."""
+    request_id = request.headers.get('X-Request-ID', '')
+    if not _REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    g.request_id = request_id
+    g.request_start = time.perf_counter()
+    g._request_context_tokens = (_request_id.set(request_id), _phases.set({}),
+                                 _counters.set({}))
+
+def _after_request(response):
+    """Tag the response with its request ID and emit the request record."""
+    request_id = getattr(g, 'request_id', None)
+    if request_id is None:
+        return response
+    response.headers['X-Request-ID'] = request_id
+    
+    if access_logger.isEnabledFor(logging.INFO):
+        duration = time.perf_counter() - g.request_start
+        phases = _phases.get() or {}
+        access_logger.info('%s', LazyJson({
+            'request_id': request_id,
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'phases': {
+                name: {'count': count, 'ms': round(seconds * 1000, 3)}
+                for name, (count, seconds) in phases.items()
+            },
+            'counters': _counters.get() or {},
+            'remote_addr': request.remote_addr,
+        }))
+    return response
+
+def _teardown_request(error=None):
+    """Clear the request context variables."""
+    tokens = g.pop('_request_context_tokens', None)
+    if tokens is not None:
+        _request_id.reset(tokens[0])
+        _phases.reset(tokens[1])
+        _counters.reset(tokens[2])
+
+def _template_started(sender, template, context, **extra):
+    """Remember when a template render started."""
+    g.setdefault('_render_starts', []).append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    """Record the time spent rendering a template, per request and per template."""
+    starts = g.get('_render_starts')
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        record_phase('render', elapsed)
+        observe('template_render_seconds', elapsed, (('template', template.name),))
+
+def init_request_context(app):
+    """
+    Register the request context hooks on the app.
+    
+    Args:
+        app: Flask application
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
@@ -0,0 +1,150 @@
+"""Full-page response cache with strong ETags and conditional GET."""
+import hashlib
+import logging
+from flask import current_app, g, request, session
+from utils.cache import TTLCache, MISSING
+from utils.config_parser import get_config_int, get_config_section
+
+logger = logging.getLogger('flask_app')
+
+# Stands in for the per-session CSRF token inside cached page bodies
+CSRF_PLACEHOLDER = b'__response_cache_csrf_token__'
+
+# [RESPONSE_CACHE] keys that are settings rather than route policies
+_SETTINGS = ('max_entries', 'ttl')
+
+# Cache-Control policy per cacheable endpoint ('errors.<code>' for error pages)
+_policies = {}
+
+# Cached entries: (status, mimetype, body, etag, has_csrf)
+_cache = TTLCache(0, 0)
+
+def _page_name():
+    """
+    Get the cache policy name for the current request.
+    
+    Returns:
+        The endpoint, 'errors.<code>' for unroutable URLs, or None
+    """
+    if request.endpoint:
+        return request.endpoint
+    error = request.routing_exception
+    code = getattr(error, 'code', None)
+    return f'errors.{code}' if code else None
+
+def _cache_key(name):
+    """
+    Build the cache key for a page from everything its output depends on.
+    
+    Error pages do not depend on the URL, so every 404 shares one entry.
+    
+    Args:
+        name: Policy name from _page_name()
+    
+    Returns:
+        Hashable cache key
+    """
+    path = '' if name.startswith('errors.') else request.full_path
+    user_id = session.get('user_id')
+    auth = (user_id, session.get('username')) if user_id else None
+    return (name, request.script_root, path, auth)
+
+def _cache_control(policy):
+    """Make a shared-cache policy private for logged-in users."""
+    if session.get('user_id'):
+        return policy.replace('public', 'private')
+    return policy
+
+def _before_request():
+    """Serve a cached page, skipping the view entirely."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    name = _page_name()
+    if name not in _policies:
+        return None
+    # Flashed messages are rendered once, so such pages are never cached
+    if '_flashes' in session:
+        return None
+    
+    key = _cache_key(name)
+    g.response_cache = (name, key)
+    entry = _cache.get(key)
+    if entry is MISSING:
+        return None
+    
+    status, mimetype, body, etag, has_csrf = entry
+    if has_csrf:
+        from flask_wtf.csrf import generate_csrf  # deferred: WTForms is slow to import
+        body = body.replace(CSRF_PLACEHOLDER, generate_csrf().encode())
+    g.response_cache_hit = True
+    response = current_app.response_class(body, status=status, mimetype=mimetype)
+    if etag:
+        response.set_etag(etag)
+    return response
+
+def _after_request(response):
+    """Store cacheable pages and apply Cache-Control and conditional GET."""
+    cached = g.pop('response_cache', None)
+    if cached is None:
+        return response
+    name, key = cached
+    expected_status = int(name[7:]) if name.startswith('errors.') else 200
+    if response.status_code != expected_status or response.direct_passthrough:
+        return response
+    
+    if not g.pop('response_cache_hit', False) and request.method == 'GET':
+        body = response.get_data()
+        token = g.get(current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token'))
+        has_csrf = bool(token) and token.encode() in body
+        etag = None
+        if has_csrf:
+            # The token differs per session, so the body gets no ETag
+            body = body.replace(token.encode(), CSRF_PLACEHOLDER)
+        elif expected_status == 200:
+            etag = hashlib.sha256(body).hexdigest()[:32]
+            response.set_etag(etag)
+        _cache.set(key, (response.status_code, response.mimetype, body, etag, has_csrf))
+    
+    response.headers['Cache-Control'] = _cache_control(_policies[name])
+    # The navbar and the public/private policy depend on the login state
+    response.vary.add('Cookie')
+    if response.status_code == 200 and response.get_etag()[0]:
+        response.make_conditional(request)
+    return response
+
+def get_response_cache_stats():
+    """
+    Get response cache metrics for monitoring.
+    
+    Returns:
+        Dictionary with hit, miss, eviction and size counts
+    """
+    return _cache.stats()
+
+def clear_response_cache():
+    """Drop every cached page, e.g. after templates or config change."""
+    _cache.clear()
+
+def init_response_cache(app):
+    """
+    Register the response cache hooks on the app.
+    
+    Reads [RESPONSE_CACHE] from config.ini: max_entries and ttl bound the
+    in-process cache, and every other key maps an endpoint (or
+    'errors.<code>') to the Cache-Control header sent with it. Only GET
+    pages listed there are cached, keyed by endpoint, URL and auth state.
+    
+    Args:
+        app: Flask application
+    """
+    global _cache
+    
+    settings = get_config_section('RESPONSE_CACHE')
+    _policies.clear()
+    _policies.update({name: policy for name, policy in settings.items()
+                      if name not in _SETTINGS})
+    _cache = TTLCache(get_config_int('RESPONSE_CACHE', 'max_entries', 512),
+                      get_config_int('RESPONSE_CACHE', 'ttl', 300))
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    logger.info("Response cache enabled for: %s", ', '.join(sorted(_policies)) or 'none')
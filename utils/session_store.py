@@ -0,0 +1,238 @@
+"""Server-side session storage with pluggable backends."""
+import secrets
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+from utils.cache import TTLCache, MISSING
+from utils.config_parser import get_config, get_config_int
+from utils.database import execute_query
+import logging
+
+logger = logging.getLogger('flask_app')
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in a backend; only its ID is in the cookie."""
+    
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+        
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        # Stored ID replaced by regenerate(), deleted when the session is saved
+        self.previous_sid = None
+    
+    # Reads mark the session accessed too, so the response varies on Cookie
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+    
+    def __contains__(self, key):
+        self.accessed = True
+        return super().__contains__(key)
+    
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+    
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+    
+    def regenerate(self):
+        """
+        Move the session to a new ID, keeping its data.
+        
+        Called when the user's authentication state changes so an ID
+        planted before login (session fixation) is never authenticated.
+        """
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+        self.accessed = True
+
+class MemorySessionBackend:
+    """Per-process LRU session store; sessions are lost on restart."""
+    
+    def __init__(self, max_entries):
+        self._cache = TTLCache(max_entries, 0)
+    
+    def load(self, sid):
+        """Return the serialized session data for sid, or None."""
+        data = self._cache.get(sid)
+        return None if data is MISSING else data
+    
+    def save(self, sid, data, expires_at):
+        """Store serialized session data until the epoch time expires_at."""
+        self._cache.set(sid, data, ttl=max(0, expires_at - time.time()))
+    
+    def delete(self, sid):
+        """Remove a session."""
+        self._cache.delete(sid)
+    
+    def sweep(self):
+        """Remove expired sessions (handled on access and by LRU eviction)."""
+
+class SQLiteSessionBackend:
+    """
+    Session store in the application database, shared by all workers.
+    
+    The sessions table is created by init_db().
+    """
+    
+    def load(self, sid):
+        row = execute_query('SELECT data FROM sessions WHERE sid = ? AND expires_at > ?',
+                            (sid, time.time()), fetch_one=True)
+        return row['data'] if row else None
+    
+    def save(self, sid, data, expires_at):
+        execute_query('INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+                      (sid, data, expires_at), commit=True)
+    
+    def delete(self, sid):
+        execute_query('DELETE FROM sessions WHERE sid = ?', (sid,), commit=True)
+    
+    def sweep(self):
+        """Remove every expired session in one indexed DELETE."""
+        execute_query('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),), commit=True)
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Session interface that keeps session data in a backend.
+    
+    The cookie only carries a signed session ID. Backends are written only
+    when the session was modified, and expired sessions are swept in one
+    batch at most every sweep_interval seconds.
+    """
+    
+    serializer = TaggedJSONSerializer()
+    
+    def __init__(self, backend, sweep_interval=300, anonymous_lifetime=3600):
+        self.backend = backend
+        self.sweep_interval = sweep_interval
+        self.anonymous_lifetime = anonymous_lifetime
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._sweep_lock = threading.Lock()
+    
+    def _get_signer(self, app):
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt='server-side-session')
+    
+    def _maybe_sweep(self):
+        """Run a batched expiry sweep if the sweep interval has elapsed."""
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            self.backend.sweep()
+        except Exception as e:
+            logger.error("Session sweep failed: %s", e)
+        finally:
+            self._sweep_lock.release()
+    
+    def open_session(self, app, request):
+        signer = self._get_signer(app)
+        if signer is None:
+            return None
+        
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = signer.unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.backend.load(sid)
+                if data is not None:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid)
+        
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+    
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+        
+        if session.accessed:
+            response.vary.add('Cookie')
+        
+        self._maybe_sweep()
+        
+        if session.previous_sid is not None:
+            self.backend.delete(session.previous_sid)
+            session.previous_sid = None
+        
+        # Emptied session: drop it from the backend and expire the cookie
+        if not session:
+            if session.modified:
+                if not session.new:
+                    self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+        
+        if not session.modified:
+            return
+        
+        expires = self.get_expiration_time(app, session)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Sessions without a login (e.g. only a CSRF token) expire sooner so
+        # anonymous traffic cannot fill the backend
+        if 'user_id' not in session:
+            lifetime = min(lifetime, self.anonymous_lifetime)
+        self.backend.save(session.sid, self.serializer.dumps(dict(session)),
+                          time.time() + lifetime)
+        
+        signed_sid = self._get_signer(app).sign(session.sid).decode()
+        response.set_cookie(name, signed_sid, expires=expires, httponly=httponly,
+                            domain=domain, path=path, secure=secure, samesite=samesite)
+
+def regenerate_session(session):
+    """
+    Give a server-side session a new ID after login or logout.
+    
+    Cookie sessions carry no ID; their whole content is re-signed instead.
+    
+    Args:
+        session: The current session
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+def init_session_store(app):
+    """
+    Install a server-side session interface on the app.
+    
+    Reads [SESSION] backend from config.ini: 'cookie' keeps Flask's signed
+    cookie sessions, 'memory' uses a per-process LRU store and 'sqlite'
+    stores sessions in the application database.
+    
+    Args:
+        app: Flask application
+    """
+    backend_name = get_config('SESSION', 'backend', 'cookie').lower()
+    if backend_name == 'memory':
+        backend = MemorySessionBackend(get_config_int('SESSION', 'memory_max_entries', 10000))
+    elif backend_name == 'sqlite':
+        backend = SQLiteSessionBackend()
+    else:
+        return
+    
+    sweep_interval = get_config_int('SESSION', 'sweep_interval', 300)
+    anonymous_lifetime = get_config_int('SESSION', 'anonymous_lifetime', 3600)
+    app.session_interface = ServerSideSessionInterface(backend, sweep_interval,
+                                                       anonymous_lifetime)
+    logger.info("Server-side sessions enabled: %s", backend_name)
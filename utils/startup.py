@@ -0,0 +1,44 @@
+"""Startup profiling: time spent in each create_app() step."""
+import time
+from contextlib import contextmanager
+
+# (step, seconds) in the order the steps ran
+_steps = []
+
+@contextmanager
+def startup_step(name):
+    """
+    Context manager that records the time spent in a startup step.
+    
+    Args:
+        name: Step name, e.g. 'init_db'
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _steps.append((name, time.perf_counter() - start))
+
+def reset_startup_steps():
+    """Forget recorded steps; called at the start of create_app()."""
+    _steps.clear()
+
+def get_startup_steps():
+    """
+    Get the recorded startup steps.
+    
+    Returns:
+        List of (step, seconds) tuples in the order they ran
+    """
+    return list(_steps)
+
+def log_startup_profile(logger, total):
+    """
+    Log a table of startup step timings.
+    
+    Args:
+        logger: Logger to write to
+        total: Total create_app() time in seconds
+    """
+    lines = [f"  {name:<24}{seconds * 1000:9.2f} ms" for name, seconds in _steps]
+    logger.info("Startup profile (create_app %.2f ms):\n%s", total * 1000, '\n'.join(lines))
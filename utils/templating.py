@@ -0,0 +1,136 @@
+"""Template rendering layer: compiled bytecode cache, fragment cache and breadcrumbs."""
+import logging
+import os
+import time
+from flask import current_app, request, session, url_for
+from jinja2 import FileSystemBytecodeCache, pass_context
+from markupsafe import Markup
+from utils.cache import TTLCache, MISSING
+from utils.config_parser import get_config, get_config_int
+from utils.metrics import observe
+
+logger = logging.getLogger('flask_app')
+
+# Breadcrumb trails as (text, endpoint) pairs; the current page has no endpoint
+BREADCRUMBS = {
+    'main.index': (('Home', None),),
+    'main.about': (('Home', 'main.index'), ('About', None)),
+    'auth.login': (('Home', 'main.index'), ('Login', None)),
+    'auth.register': (('Home', 'main.index'), ('Register', None)),
+}
+
+# Endpoints whose navbar hides the Login/Register links
+AUTH_FORM_ENDPOINTS = frozenset(('auth.login', 'auth.register'))
+
+# Resolved breadcrumbs keyed by (endpoint, script_root)
+_breadcrumb_cache = {}
+
+# Rendered fragments keyed by fragment name and the state it depends on
+_fragment_cache = TTLCache(0, 0)
+
+def get_breadcrumb(endpoint):
+    """
+    Get the breadcrumb trail for an endpoint.
+    
+    URLs are resolved on first use and reused by every later request.
+    
+    Args:
+        endpoint: Endpoint name, e.g. 'main.about'
+    
+    Returns:
+        Tuple of {'text', 'url'} dictionaries
+    """
+    key = (endpoint, request.script_root)
+    trail = _breadcrumb_cache.get(key)
+    if trail is None:
+        trail = tuple({'text': text, 'url': url_for(target) if target else None}
+                      for text, target in BREADCRUMBS.get(endpoint, ()))
+        _breadcrumb_cache[key] = trail
+    return trail
+
+def _fragment_key(name, app_name):
+    """
+    Build the cache key for a fragment from everything its output depends on.
+    
+    Args:
+        name: Fragment name
+        app_name: Application name shown in the fragment
+    
+    Returns:
+        Hashable cache key
+    """
+    key = (name, request.script_root, app_name)
+    if name == 'navbar':
+        user_id = session.get('user_id')
+        if user_id:
+            key += (user_id, session.get('username'))
+        else:
+            key += (None, request.endpoint in AUTH_FORM_ENDPOINTS)
+    return key
+
+@pass_context
+def cached_fragment(context, name):
+    """
+    Render templates/partials/<name>.html, reusing the cached output.
+    
+    Fragments are cached per auth state, so they must only depend on the
+    values in _fragment_key(). Caching is bypassed while templates
+    auto-reload (debug mode) so edits show up immediately.
+    
+    Args:
+        context: Calling template's context (supplies app_name)
+        name: Fragment name
+    
+    Returns:
+        Rendered fragment markup
+    """
+    app_name = context.get('app_name')
+    use_cache = not current_app.jinja_env.auto_reload
+    if use_cache:
+        key = _fragment_key(name, app_name)
+        html = _fragment_cache.get(key)
+        if html is not MISSING:
+            return html
+    
+    template = current_app.jinja_env.get_template(f'partials/{name}.html')
+    start = time.perf_counter()
+    html = Markup(template.render(app_name=app_name))
+    observe('template_render_seconds', time.perf_counter() - start,
+            (('template', template.name),))
+    
+    if use_cache:
+        _fragment_cache.set(key, html)
+    return html
+
+def get_fragment_cache_stats():
+    """
+    Get fragment cache metrics for monitoring.
+    
+    Returns:
+        Dictionary with hit, miss, eviction and size counts
+    """
+    return _fragment_cache.stats()
+
+def init_templating(app):
+    """
+    Configure template rendering on the app.
+    
+    Reads [TEMPLATES] from config.ini: compiled templates are stored in
+    bytecode_cache_dir so new workers skip Jinja compilation, and rendered
+    fragments are kept in a bounded in-process cache.
+    
+    Args:
+        app: Flask application
+    """
+    global _fragment_cache
+    
+    cache_dir = get_config('TEMPLATES', 'bytecode_cache_dir', 'instance/jinja_cache')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        logger.info("Template bytecode cache: %s", cache_dir)
+    
+    _fragment_cache = TTLCache(get_config_int('TEMPLATES', 'fragment_cache_size', 1024),
+                               get_config_int('TEMPLATES', 'fragment_cache_ttl', 3600))
+    _breadcrumb_cache.clear()
+    app.jinja_env.globals['cached_fragment'] = cached_fragment
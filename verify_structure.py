@@ -23,6 +23,7 @@ def main():
     # Check core files
     print("Core Files:")
     all_good &= check_file_exists(os.path.join(base_dir, "app.py"), "Main application")
+    all_good &= check_file_exists(os.path.join(base_dir, "server.py"), "Production server")
     all_good &= check_file_exists(os.path.join(base_dir, "config.ini"), "Configuration")
     all_good &= check_file_exists(os.path.join(base_dir, "requirements.txt"), "Requirements")
     print()
@@ -58,8 +59,11 @@ def main():
     all_good &= check_file_exists(os.path.join(base_dir, "templates", "about.html"), "About page")
     all_good &= check_file_exists(os.path.join(base_dir, "templates", "auth", "login.html"), "Login page")
     all_good &= check_file_exists(os.path.join(base_dir, "templates", "auth", "register.html"), "Register page")
+    all_good &= check_file_exists(os.path.join(base_dir, "templates", "partials", "navbar.html"), "Navbar partial")
+    all_good &= check_file_exists(os.path.join(base_dir, "templates", "partials", "footer.html"), "Footer partial")
     all_good &= check_file_exists(os.path.join(base_dir, "templates", "errors", "404.html"), "404 page")
     all_good &= check_file_exists(os.path.join(base_dir, "templates", "errors", "500.html"), "500 page")
+    all_good &= check_file_exists(os.path.join(base_dir, "templates", "errors", "503.html"), "503 page")
     print()
     
     # Check static files